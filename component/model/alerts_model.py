@@ -1,11 +1,13 @@
 import json
 import os
 import urllib
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
 from pathlib import Path
 from zipfile import ZipFile
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
 import pytz
 from ipyleaflet import GeoJSON
@@ -13,10 +15,12 @@ from sepal_ui import model
 from sepal_ui.scripts.utils import random_string
 from shapely.geometry import Polygon
 from tqdm.auto import tqdm
-from traitlets import Any, Bool, Int, Unicode, observe
+from traitlets import Any, Bool, Int, List, Unicode, observe
 
 import component.parameter as param
 import component.scripts as scripts
+from component.message import cm
+from component.scripts.archive import ALERTS_ARCHIVE
 from sepal_ui.planetapi import PlanetModel
 
 
@@ -42,12 +46,22 @@ class AlertModel(model.Model):
     "str: firms api key. it will be either the sepal one or given by user. It will be gathered from authenticate_event."
     satsource = Unicode("modis_nrt").tag(sync=True)
     "str: source of satellite. the available values must match parameter.SAT_SOURCE"
+    sensors = List([]).tag(sync=True)
+    "list: sources of satellite to fetch together and fuse. If empty, only satsource is used."
     alerts_type = Unicode("nrt").tag(sync=True)
     "str: type of alerts, either nrt (near real time) or historic"
     start_date = Unicode("").tag(sync=True)
     "str (YYYY-MM-DD format): initial date. for historic queries"
     offset_days = Unicode("24h").tag(sync=True)
     "str: number of offset days after the start date. for historic queries."
+    end_date = Unicode("").tag(sync=True)
+    "str (YYYY-MM-DD format): optional last date. for historic queries longer than the offset days."
+
+    # Navigation parameters
+    order = Unicode("firms").tag(sync=True)
+    "str: order in which the alerts are navigated, one of param.TRAVERSAL_ORDERS"
+    by_event = Bool(False).tag(sync=True)
+    "bool: navigate, display and review the alerts by fire event instead of one by one"
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -57,25 +71,102 @@ class AlertModel(model.Model):
         self.aoi_alerts = None
         self.current_alert = None
 
+        # UTC time of the last successful request, used to refresh nrt alerts
+        self.last_fetch = None
+
         self.planet_model = PlanetModel()
 
-        # It will store both draw and country geometry
+        # It will store both draw and country geometry, as a feature collection
+        # of one or several features. Set it with set_aoi.
         self.aoi_geometry = None
+
+        # Features of the aoi as a geodataframe, built once for each aoi
+        self.aoi_gdf = None
+
+        # Number of alerts of each aoi feature, keyed by feature name
+        self.aoi_counts = {}
+
+        # (min_date, max_date) of each FIRMS source, keyed by data_id
         self.availability = None
 
-    def get_alerts_url(self):
+        # Grid cells aggregates of the aoi alerts, keyed by zoom level
+        self.aggregates = {}
+
+        # Ids of the aoi alerts of each confidence class, and of all of them
+        self.confidence_index = {}
+
+        # Positions of the aoi alerts of each fire event, keyed by event id
+        self.event_index = {}
+
+    def get_end_date(self):
+        """Get the last date of the historic query. If no end date is set, it's
+        computed from the start date and the offset days"""
+
+        if self.end_date:
+            return self.end_date
+
+        return scripts.get_end_date(self.start_date, self.offset_days)
+
+    def get_windows(self):
+        """Get the (start date, days) windows to request depending on the alerts
+        type. Historic ranges are split in windows accepted by the FIRMS API"""
+
+        if self.alerts_type == "nrt":
+            return [("", scripts.parse_offset(self.offset_days))]
+
+        if self.end_date and self.end_date < self.start_date:
+            raise Exception(cm.alerts.errors.end_date)
+
+        return scripts.get_windows(self.start_date, self.get_end_date())
+
+    def get_sensors(self):
+        """Get the sources of satellite to request"""
+
+        return list(self.sensors) or [self.satsource]
+
+    def get_max_date(self, satsource):
+        """Get the last date (YYYY-MM-DD) published by FIRMS for a source of
+        satellite, from the data availability. None if it's unknown.
+
+        Args:
+            satsource (str): source of satellite, as in param.SAT_SOURCE
+        """
+
+        sat_source = param.SAT_SOURCE[self.alerts_type][satsource]
+
+        return (self.availability or {}).get(sat_source, (None, None))[1]
+
+    def get_date_range(self):
+        """Get the (min_date, max_date) range published by FIRMS for all the sources
+        of satellite to request, from the data availability"""
+
+        ranges = [
+            self.availability[param.SAT_SOURCE[self.alerts_type][satsource]]
+            for satsource in self.get_sensors()
+        ]
+
+        return max(r[0] for r in ranges), min(r[1] for r in ranges)
+
+    def get_alerts_url(self, bounds=None, window=None, satsource=None):
         """build the firms url to retrieve alerts depending on the users inputs stored
-        in the model"""
+        in the model
+
+        Args:
+            bounds (tuple, optional): (west, south, east, north) bounds of the
+                request. Defaults to the aoi bounds.
+            window (tuple, optional): (start date, days) of the request. Defaults
+                to the first window of the query.
+            satsource (str, optional): source of satellite. Defaults to satsource.
+        """
 
-        sat_source = param.SAT_SOURCE[self.alerts_type][self.satsource]
-        bounds = ",".join(
-            list(
-                str(int(x))
-                for x in gpd.GeoDataFrame.from_features(self.aoi_geometry).total_bounds
-            )
-        )
-        offset_days = scripts.parse_offset(self.offset_days)
-        start_date = self.start_date
+        satsource = satsource or self.satsource
+        sat_source = param.SAT_SOURCE[self.alerts_type][satsource]
+
+        if bounds is None:
+            bounds = scripts.get_outer_bounds(self.get_aoi_gdf().total_bounds)
+
+        start_date, offset_days = window or self.get_windows()[0]
+        bounds = scripts.format_bounds(bounds)
 
         # Depending on the type of alerts, the args to the request will vary.
         args = [self.firms_api_key, sat_source, bounds, offset_days, start_date]
@@ -85,12 +176,72 @@ class AlertModel(model.Model):
 
         return param.REQUEST_HISTORIC.format(*args)
 
+    def set_aoi(self, geometry, gdf=None):
+        """Set the area of interest and forget the geodataframe of the previous one
+
+        Args:
+            geometry (dict): GeoJSON feature collection of the aoi, None to remove it
+            gdf (gpd.GeoDataFrame, optional): features of the aoi if they are
+                already known, built from the geometry when needed otherwise
+        """
+
+        self.aoi_geometry = geometry
+        self.aoi_gdf = gdf
+
+    def get_aoi_gdf(self):
+        """Get the features of the area of interest as a geodataframe"""
+
+        if self.aoi_gdf is None:
+            self.aoi_gdf = gpd.GeoDataFrame.from_features(self.aoi_geometry).set_crs(
+                "EPSG:4326"
+            )
+
+        return self.aoi_gdf
+
+    def get_request_tiles(self):
+        """Get the tight sub-boxes covering the area of interest, see
+        scripts.get_tiles"""
+
+        return scripts.get_tiles(self.get_aoi_gdf())
+
+    def get_area_saving(self, tiles):
+        """Get the share of the aoi bounding box area that is not requested when
+        using the given sub-boxes"""
+
+        return scripts.get_area_saving(self.get_aoi_gdf(), tiles)
+
+    def get_cache_key(self, bounds, window, satsource=None):
+        """Normalize the request parameters to identify the FIRMS response in the
+        cache
+
+        Args:
+            bounds (tuple): (west, south, east, north) bounds of the request
+            window (tuple): (start date, days) of the request
+            satsource (str, optional): source of satellite. Defaults to satsource.
+        """
+
+        satsource = satsource or self.satsource
+        sat_source = param.SAT_SOURCE[self.alerts_type][satsource]
+        start_date, offset_days = window
+
+        return [sat_source, scripts.format_bounds(bounds), offset_days, start_date]
+
     def metadata_change(self, change):
-        """Edit 'validate' and 'confidence' columns in the current aoi geodataframe.
+        """Edit 'validate' and 'confidence' columns in the current aoi geodataframe,
+        for all the alerts of the current fire event when navigating by event.
         This event is trigged when metadata_table input values change
 
         """
-        self.aoi_alerts.loc[self.current_alert, change["name"]] = change["new"]
+
+        # Displaying an alert sets the table to its values, nothing to change
+        if self.aoi_alerts.at[self.current_alert, change["name"]] == change["new"]:
+            return
+
+        ids = self.current_alert
+        if self.by_event:
+            ids = self.get_event_ids(self.current_alert)
+
+        self.aoi_alerts.loc[ids, change["name"]] = change["new"]
 
     @observe("reset")
     def reset_alerts(self, change):
@@ -100,6 +251,11 @@ class AlertModel(model.Model):
             self.alerts = None
             self.aoi_alerts = None
             self.current_alert = None
+            self.last_fetch = None
+            self.aoi_counts = {}
+            self.aggregates = {}
+            self.confidence_index = {}
+            self.event_index = {}
 
     def get_alerts_name(self):
         """Create an output name for the aoi alerts"""
@@ -109,12 +265,14 @@ class AlertModel(model.Model):
 
         method = f"custom_draw" if not self.country else self.country
 
-        if self.alerts_type == "recent":
-            acq_date = f"last{self.timespan}"
+        if self.alerts_type == "nrt":
+            acq_date = f"last{self.offset_days}"
         else:
-            acq_date = f"from{self.start_date}_to{self.start_date}"
+            acq_date = f"from{self.start_date}_to{self.get_end_date()}"
+
+        sensors = "-".join(self.get_sensors())
 
-        return f"{now}_{self.satsource}_{method}_{acq_date}"
+        return f"{now}_{sensors}_{method}_{acq_date}"
 
     def write_alerts(self):
         """Write clipped alerts in a new ESRI shapefile on the module results
@@ -128,35 +286,203 @@ class AlertModel(model.Model):
 
         output = param.ALERTS_DIR / folder / f"{name}.shp"
 
+        # Shapefiles don't support datetime fields
+        acq_datetime = self.aoi_alerts.acq_datetime.dt.strftime("%Y-%m-%dT%H:%MZ")
+        alerts = self.aoi_alerts.assign(acq_datetime=acq_datetime)
+
+        # Shapefiles field names are cut to 10 characters, name them explicitly
+        alerts = alerts.rename(columns=param.SHAPEFILE_COLUMNS)
+
         # It will overwrite any previous created file.
-        self.aoi_alerts.to_file(output)
+        alerts.to_file(output)
 
         return folder, name
 
-    def get_firms_alerts(self):
-        """from a parsed API URL, perform the request by using a pandas geodataframe"""
+    def get_firms_alerts(self, callback=None):
+        """Split the aoi in a grid of sub-boxes and the dates in windows accepted by
+        the FIRMS API, request all of them concurrently and merge them into a single
+        geodataframe
 
-        df = pd.read_csv(self.get_alerts_url())
+        Args:
+            callback (callable, optional): function called each time all the
+                requests of a window are done, with the window, the number of
+                completed windows and the total number of windows as arguments.
+        """
 
-        self.alerts = gpd.GeoDataFrame(
-            df, geometry=gpd.points_from_xy(df.longitude, df.latitude), crs="EPSG:4326"
-        ).reset_index()
+        # Take the time before the requests so the next refresh doesn't miss the
+        # alerts published while downloading
+        fetch_time = datetime.now(tz=pytz.timezone("UTC"))
+
+        self.alerts = self._request_alerts(self.get_windows(), callback)
+        self.last_fetch = fetch_time
+
+    def _request_alerts(self, windows, callback=None, use_cache=True):
+        """Request the alerts of the given windows over the aoi sub-boxes, for each
+        of the sensors. The alerts of several sensors are fused together.
+
+        Args:
+            windows (list): (start date, days) windows to request
+            callback (callable, optional): see get_firms_alerts
+            use_cache (bool): whether to use the cached FIRMS responses or not
+
+        Returns:
+            gpd.GeoDataFrame: the merged alerts
+        """
+
+        tiles = self.get_request_tiles()
+        sensors = self.get_sensors()
+
+        sat_sources = {s: param.SAT_SOURCE[self.alerts_type][s] for s in sensors}
+        schemas = {s: scripts.get_schema(sat_sources[s]) for s in sensors}
+        max_dates = {s: self.get_max_date(s) for s in sensors}
+
+        def read_tile(satsource, tile, window):
+            # Cached responses were archived when they were downloaded. The dates
+            # not published yet (standard processing sources are months late)
+            # are returned empty, don't mark them as archived.
+            def archive(df):
+                max_date = max_dates[satsource]
+                dates = [
+                    day
+                    for day in scripts.get_dates([window])
+                    if max_date is not None and day <= max_date
+                ]
+                ALERTS_ARCHIVE.write(sat_sources[satsource], df, tile, dates)
+
+            return scripts.read_alerts(
+                self.get_alerts_url(tile, window, satsource),
+                self.get_cache_key(tile, window, satsource) if use_cache else None,
+                scripts.get_cache_ttl(
+                    sat_sources[satsource],
+                    scripts.get_dates([window])[-1],
+                    max_dates[satsource],
+                ),
+                schemas[satsource],
+                self.firms_api_key,
+                archive,
+            )
+
+        # Historic dates already archived are read locally, only the missing
+        # ones are requested to FIRMS
+        frames = {satsource: [] for satsource in sensors}
+        jobs = []
+        for satsource in sensors:
+            for tile in tiles:
+                tile_windows = windows
+
+                if self.alerts_type == "historic" and use_cache:
+                    dates = scripts.get_dates(windows)
+                    gaps = ALERTS_ARCHIVE.get_gaps(sat_sources[satsource], tile, dates)
+                    archived = ALERTS_ARCHIVE.read(
+                        sat_sources[satsource],
+                        tile,
+                        [day for day in dates if day not in gaps],
+                    )
+
+                    if archived is not None:
+                        frames[satsource].append(archived)
+
+                    tile_windows = scripts.get_gap_windows(gaps)
+
+                jobs += [(satsource, tile, window) for window in tile_windows]
+
+        with ThreadPoolExecutor(max_workers=param.MAX_WORKERS) as executor:
+            futures = {executor.submit(read_tile, *job): job for job in jobs}
+
+            # Keep track of the pending requests of each window to report the
+            # progress once all its sub-boxes are downloaded
+            pending = {}
+            for _, _, window in jobs:
+                pending[window] = pending.get(window, 0) + 1
+
+            for future in as_completed(futures):
+                satsource, _, window = futures[future]
+                frames[satsource].append(future.result())
+
+                pending[window] -= 1
+                if pending[window] == 0 and callback:
+                    done = sum(1 for count in pending.values() if count == 0)
+                    callback(window, done, len(pending))
+
+        dfs = []
+        for satsource in sensors:
+            if not frames[satsource]:
+                frames[satsource].append(scripts.get_empty_alerts(schemas[satsource]))
+
+            # Alerts lying on the shared edges of the sub-boxes are returned twice
+            df = pd.concat(frames[satsource], ignore_index=True)
+            df = df.drop_duplicates(ignore_index=True)
+            df = scripts.apply_schema(df, schemas[satsource])
+            dfs.append(scripts.add_acq_datetime(df))
+
+        if len(sensors) > 1:
+            df = scripts.fuse_alerts(
+                [scripts.normalize_alerts(df, s) for df, s in zip(dfs, sensors)]
+            )
+        else:
+            df = dfs[0]
+
+        # Point geometries are only built for the alerts kept by the clipping
+        return df.reset_index()
 
     def clip_to_aoi(self):
         """Clip recent or historical geodataframe with area of interest and save it."""
 
+        self.aoi_alerts, counts = self._clip(self.alerts)
+        self.aoi_counts = dict(zip(self.get_aoi_names(), counts.tolist()))
+
+    def _clip(self, alerts):
+        """Get the alerts intersecting the area of interest as a geodataframe.
+
+        Each alert is assigned to the first aoi feature containing it, in the
+        order of the features (aoi_id column): alerts in overlapping features are
+        only kept once. They are still counted in each of the features.
+
+        Returns:
+            (gpd.GeoDataFrame, np.ndarray): the clipped alerts and the number of
+                alerts of each feature
+        """
+
         if not self.aoi_geometry:
             raise Exception(cm.ui.valid_aoi)
 
-        alerts = self.alerts
-        clip_geometry = (
-            gpd.GeoDataFrame.from_features(self.aoi_geometry)
-            .set_crs("EPSG:4326")
-            .iloc[0]
-            .geometry
+        geometries = np.array(
+            [scripts.split_antimeridian(geom) for geom in self.get_aoi_gdf().geometry]
+        )
+
+        lon, lat = alerts.longitude.to_numpy(), alerts.latitude.to_numpy()
+
+        if len(geometries) == 1:
+            positions = scripts.clip_points(lon, lat, geometries[0])
+            features = np.zeros(len(positions), dtype="int64")
+            counts = np.array([len(positions)])
+
+        else:
+            positions, features = scripts.assign_features(lon, lat, geometries)
+            counts = np.bincount(features, minlength=len(geometries))
+
+            # Alerts in overlapping features are only kept once
+            positions, first = np.unique(positions, return_index=True)
+            features = features[first]
+
+        alerts = alerts.take(positions)
+        alerts["aoi_id"] = features
+
+        gdf = gpd.GeoDataFrame(
+            alerts,
+            geometry=gpd.points_from_xy(alerts.longitude, alerts.latitude),
+            crs="EPSG:4326",
         )
 
-        self.aoi_alerts = alerts[alerts.geometry.intersects(clip_geometry)].copy()
+        return gdf, counts
+
+    def get_aoi_names(self):
+        """Get the name of each feature of the area of interest"""
+
+        return [
+            (feature.get("properties") or {}).get("name", f"{cm.aoi.feature} {i}")
+            for i, feature in enumerate(self.aoi_geometry["features"])
+        ]
 
     def format_gdf(self):
         """Reformat alerts aoi geodataframe to fit with the outputs needs.
@@ -164,60 +490,430 @@ class AlertModel(model.Model):
         whole geodataframe.
         """
 
+        self._format(self.aoi_alerts)
+        self.cluster_events()
+        self.build_confidence_index()
+
+    def _format(self, alerts):
+        """Add the user's inputs columns and format the acquisition time of the
+        given alerts inplace"""
+
         # Create two new columns for user's inputs
-        self.aoi_alerts["reviewed"] = ""
-        self.aoi_alerts["observ"] = ""
+        alerts["reviewed"] = ""
+        alerts["observ"] = ""
+
+        alerts["acq_time"] = scripts.format_acq_time(alerts.acq_time)
+
+        # Common confidence classes of the discrete and categorical values
+        alerts["conf_class"] = self.get_confidence_classes(alerts)
 
-        def parse(time):
-            """Parse int time into string formated time"""
-            time = str(time)
-            return f"{time[:-2]}:{time[-2:]}"
+    def get_confidence_classes(self, alerts):
+        """Get the confidence class of each alert, see
+        scripts.get_confidence_classes"""
 
-        self.aoi_alerts["acq_time"] = self.aoi_alerts.acq_time.apply(parse)
+        satsources = alerts.sensor if "sensor" in alerts.columns else self.satsource
 
-    def alerts_to_squares(self):
-        """Convert the point alerts into square polygons to display on map"""
+        return scripts.get_confidence_classes(satsources, alerts.confidence)
 
-        # Convert alert's geometries to 54009 (projected crs)
-        # and use 375m as buffer
-        geometry_col = (
-            self.aoi_alerts.to_crs("ESRI:54009")["geometry"]
-            .buffer(187.5, cap_style=3)
-            .copy()
+    def cluster_events(self):
+        """Group the aoi alerts into fire events and index the alerts of each
+        event, see scripts.get_events"""
+
+        self.aoi_alerts["event_id"] = scripts.get_events(self.aoi_alerts)
+        self.event_index = self.aoi_alerts.groupby("event_id").indices
+
+    def get_event_alerts(self, alert_id):
+        """Get the alerts of the fire event of an alert"""
+
+        event_id = self.aoi_alerts.at[alert_id, "event_id"]
+
+        return self.aoi_alerts.iloc[self.event_index[event_id]]
+
+    def get_event_ids(self, alert_id):
+        """Get the ids of all the alerts of the fire event of an alert"""
+
+        return self.get_event_alerts(alert_id).index.tolist()
+
+    def get_event_bounds(self, alert_id):
+        """Get the (west, south, east, north) bounds of the fire event of an
+        alert"""
+
+        alerts = self.get_event_alerts(alert_id)
+
+        return (
+            alerts.longitude.min(),
+            alerts.latitude.min(),
+            alerts.longitude.max(),
+            alerts.latitude.max(),
         )
 
-        square_alerts = self.aoi_alerts.assign(geometry=geometry_col)
+    def get_event_dates(self, alert_id):
+        """Get the first and last acquisition dates of the fire event of an
+        alert, as YYYY-MM-DD strings"""
 
-        # Divide alerts into confidence categories
+        acq_dates = self.get_event_alerts(alert_id).acq_date.astype(str)
 
-        def get_color(feature):
-            confidence = feature["properties"]["confidence"]
-            color = scripts.get_confidence_color(self.satsource, confidence)
-            return {
-                "color": color,
-                "fillColor": color,
+        return acq_dates.min(), acq_dates.max()
+
+    def get_event_summary(self, alert_id):
+        """Get the number of alerts and the dates of the fire event of an alert,
+        as metadata rows"""
+
+        return pd.Series(
+            {
+                "event_size": len(self.get_event_alerts(alert_id)),
+                "event_dates": " - ".join(self.get_event_dates(alert_id)),
             }
+        )
 
-        json_aoi_alerts = json.loads(square_alerts.to_crs("EPSG:4326").to_json())
+    def get_planet_search(self, alert_id, point=None):
+        """Get the parameters of the Planet search of an alert: the area around
+        the alert, or around its fire event when navigating by event, and the
+        days around its acquisition dates
 
+        Args:
+            alert_id (int): id of the alert
+            point (tuple, optional): (lon, lat) coordinates to search instead of
+                the alert ones, ignored when navigating by event
+
+        Returns:
+            tuple: (west, south, east, north) bounds, start and end datetimes and
+                maximum cloud cover between 0 and 1
+        """
+
+        if self.by_event:
+            west, south, east, north = self.get_event_bounds(alert_id)
+            first, last = self.get_event_dates(alert_id)
+        else:
+            alert = self.aoi_alerts.loc[alert_id]
+            west, south = (east, north) = point or (alert.longitude, alert.latitude)
+            first = last = alert.acq_date
+
+        # Search around the point or the event
+        margin = 0.001
+        bounds = (west - margin, south - margin, east + margin, north + margin)
+
+        start = datetime.strptime(str(first), "%Y-%m-%d")
+        end = datetime.strptime(str(last), "%Y-%m-%d")
+
+        start -= timedelta(days=self.days_before)
+        end += timedelta(days=self.days_after + 1)
+
+        return bounds, start, end, self.cloud_cover / 100
+
+    def build_confidence_index(self):
+        """Index the ids of the aoi alerts by confidence class, so filtering and
+        counting the alerts of a class doesn't scan them. The ids of each class
+        are sorted in the navigation order"""
+
+        traversal = self.get_traversal_order()
+        codes = self.aoi_alerts.conf_class.cat.codes.to_numpy()[traversal]
+        ids = self.aoi_alerts.index.to_numpy()[traversal]
+
+        # Group the ids by class, keeping their order
+        order = np.argsort(codes, kind="stable")
+        bounds = np.searchsorted(
+            codes[order], np.arange(len(param.CONFIDENCE_CLASSES) + 1)
+        )
+
+        self.confidence_index = {"All": ids.tolist()}
+        for i, conf_class in enumerate(param.CONFIDENCE_CLASSES):
+            self.confidence_index[conf_class] = ids[
+                order[bounds[i] : bounds[i + 1]]
+            ].tolist()
+
+    def get_traversal_order(self):
+        """Get the positions of the aoi alerts in the navigation order. Alerts
+        close to each other are visited one after the other with the hilbert
+        and nearest orders, so the map and Planet tiles can be reused"""
+
+        lon = self.aoi_alerts.longitude.to_numpy()
+        lat = self.aoi_alerts.latitude.to_numpy()
+
+        order = self.order
+        if order == "nearest" and len(lon) > param.NEAREST_MAX_ALERTS:
+            order = "hilbert"
+
+        if order == "nearest":
+            return scripts.get_nearest_order(lon, lat)
+        elif order == "hilbert":
+            return scripts.get_hilbert_order(lon, lat)
+
+        return np.arange(len(lon))
+
+    def get_confidence_ids(self, confidence):
+        """Get the ids of the aoi alerts of a confidence class. When navigating
+        by event, only the first alert of each event is kept
+
+        Args:
+            confidence (str): one of param.CONFIDENCE_CLASSES, or "All"
+        """
+
+        ids = self.confidence_index.get(confidence, [])
+
+        if self.by_event and ids:
+            events = self.aoi_alerts.event_id.loc[ids]
+            ids = events.index[~events.duplicated().to_numpy()].tolist()
+
+        return ids
+
+    def refresh_alerts(self):
+        """Request the near real time alerts published since the last fetch and
+        append the new ones to the aoi alerts, keeping the user's inputs of the
+        existing ones.
+
+        Returns:
+            gpd.GeoDataFrame: the new aoi alerts
+        """
+
+        if self.alerts_type != "nrt" or self.aoi_alerts is None:
+            raise Exception(cm.alerts.errors.no_refresh)
+
+        fetch_time = datetime.now(tz=pytz.timezone("UTC"))
+
+        # FIRMS day ranges are counted in days from today (UTC)
+        days = (fetch_time.date() - self.last_fetch.date()).days + 1
+        days = min(days, param.MAX_DAY_RANGE)
+
+        # Recent responses could be cached, always request the latest data
+        fetched = self._request_alerts([("", days)], use_cache=False)
+
+        # Drop the alerts that are already loaded, so only the new ones are
+        # clipped and added to the counts of the aoi features
+        keys = pd.MultiIndex.from_frame(fetched[param.ALERT_KEYS])
+        loaded_keys = pd.MultiIndex.from_frame(self.alerts[param.ALERT_KEYS])
+        fetched = fetched[~keys.isin(loaded_keys)]
+
+        new_alerts, counts = self._clip(fetched)
+        self._format(new_alerts)
+
+        self.aoi_counts = {
+            name: self.aoi_counts.get(name, 0) + count
+            for name, count in zip(self.get_aoi_names(), counts.tolist())
+        }
+
+        # Continue the numbering of the alerts
+        start = self.aoi_alerts.index.max() + 1 if len(self.aoi_alerts) else 0
+        new_alerts.index = range(start, start + len(new_alerts))
+        new_alerts["index"] = new_alerts.index
+
+        self.alerts = pd.concat([self.alerts, fetched], ignore_index=True)
+        self.aoi_alerts = pd.concat([self.aoi_alerts, new_alerts])
+        self.last_fetch = fetch_time
+
+        # New alerts can extend or merge the existing events
+        self.cluster_events()
+        self.build_confidence_index()
+
+        return new_alerts
+
+    def alerts_to_squares(self, alerts=None):
+        """Convert the point alerts into square polygons to display on map
+
+        Args:
+            alerts (gpd.GeoDataFrame, optional): alerts to convert. Defaults to all
+                the aoi alerts.
+        """
+
+        alerts = self.aoi_alerts if alerts is None else alerts
+
+        # Each feature holds its own style, colored by confidence
         return GeoJSON(
-            data=json_aoi_alerts,
+            data=self.alerts_to_features(alerts),
             name="Alerts",
             style={"fillOpacity": 0.1, "weight": 2},
             hover_style={"color": "white", "dashArray": "0", "fillOpacity": 0.5},
-            style_callback=get_color,
         )
 
+    def alerts_to_features(self, alerts, compact=True):
+        """Convert the point alerts into a feature collection of square polygons
+
+        Args:
+            alerts (gpd.GeoDataFrame): alerts to convert
+            compact (bool): only keep the properties needed by the map (confidence
+                and style) with quantized coordinates. Otherwise, all the columns
+                are kept as properties, at full precision.
+        """
+
+        rings = scripts.get_squares(
+            alerts.longitude.to_numpy(),
+            alerts.latitude.to_numpy(),
+            self.get_pixel_sizes(alerts) / 2,
+        )
+
+        if compact:
+            rings = rings.round(param.COORDINATES_PRECISION)
+
+            # The styles are only built once for each color
+            styles = {
+                color: {"color": color, "fillColor": color}
+                for color in param.AGGREGATE_COLORS
+            }
+            properties = [
+                {"confidence": conf_class, "style": styles[color]}
+                for conf_class, color in zip(
+                    alerts.conf_class.astype(str).tolist(),
+                    self.get_colors(alerts).tolist(),
+                )
+            ]
+
+        else:
+            # Timestamps are serialized as iso strings
+            properties = json.loads(
+                alerts.drop(columns="geometry").to_json(
+                    orient="records", date_format="iso"
+                )
+            )
+
+        features = [
+            {
+                "type": "Feature",
+                "id": int(id_),
+                "properties": props,
+                "geometry": {"type": "Polygon", "coordinates": [ring]},
+            }
+            for id_, props, ring in zip(alerts.index, properties, rings.tolist())
+        ]
+
+        return {"type": "FeatureCollection", "features": features}
+
+    def get_payload_sizes(self, alerts):
+        """Estimate the size in bytes of the features of the alerts sent to the map,
+        with all their columns and with the compact serialization. Only the first
+        PAYLOAD_SAMPLE alerts are serialized.
+
+        Args:
+            alerts (gpd.GeoDataFrame): alerts to measure
+
+        Returns:
+            (int, int): full and compact sizes
+        """
+
+        sample = alerts.iloc[: param.PAYLOAD_SAMPLE]
+
+        if sample.empty:
+            return 0, 0
+
+        return tuple(
+            scripts.get_payload_size(self.alerts_to_features(sample, compact))
+            * len(alerts)
+            // len(sample)
+            for compact in (False, True)
+        )
+
+    def get_renderer(self, alerts=None):
+        """Get a raster tiles renderer of the alerts
+
+        Args:
+            alerts (gpd.GeoDataFrame, optional): alerts to render. Defaults to all
+                the aoi alerts.
+        """
+
+        alerts = self.aoi_alerts if alerts is None else alerts
+
+        return scripts.AlertsRenderer(
+            alerts.longitude.to_numpy(),
+            alerts.latitude.to_numpy(),
+            self.get_colors(alerts),
+            self.get_pixel_sizes(alerts),
+        )
+
+    def get_colors(self, alerts):
+        """Get the confidence color of each alert"""
+
+        colors = np.array(param.AGGREGATE_COLORS)
+
+        return colors[alerts.conf_class.cat.codes.to_numpy()]
+
+    def compute_aggregates(self):
+        """Aggregate the aoi alerts in grid cells for each of the low zoom levels,
+        see scripts.get_aggregates"""
+
+        self.aggregates = scripts.get_aggregates(
+            self.aoi_alerts.longitude.to_numpy(),
+            self.aoi_alerts.latitude.to_numpy(),
+            self.aoi_alerts.conf_class.cat.codes.to_numpy(),
+            self.aoi_alerts.frp.to_numpy(),
+        )
+
+    def aggregates_to_layer(self, zoom):
+        """Convert the aggregates of a zoom level into a layer of grid cells colored
+        by the highest confidence of their alerts
+
+        Args:
+            zoom (int): zoom level, one of param.AGGREGATE_ZOOMS
+        """
+
+        cells = self.aggregates[zoom]
+        level = zoom + int(np.log2(256 // param.AGGREGATE_CELL))
+
+        west, south, east, north = scripts.get_cells_bounds(
+            cells.col.to_numpy(), cells.row.to_numpy(), level
+        )
+
+        features = [
+            {
+                "type": "Feature",
+                "properties": {
+                    "count": count,
+                    "frp": round(frp, 1),
+                    "style": {
+                        "color": param.AGGREGATE_COLORS[rank],
+                        "fillColor": param.AGGREGATE_COLORS[rank],
+                    },
+                },
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": [[[w, s], [e, s], [e, n], [w, n], [w, s]]],
+                },
+            }
+            for count, rank, frp, w, s, e, n in zip(
+                cells["count"].tolist(),
+                cells["rank"].tolist(),
+                cells.frp.tolist(),
+                west.tolist(),
+                south.tolist(),
+                east.tolist(),
+                north.tolist(),
+            )
+        ]
+
+        return GeoJSON(
+            data={"type": "FeatureCollection", "features": features},
+            name="Alerts",
+            style={"fillOpacity": 0.5, "weight": 1},
+            hover_style={"fillOpacity": 0.8},
+        )
+
+    def get_pixel_sizes(self, alerts):
+        """Get the pixel size (in meters) of the sensor of each alert"""
+
+        if "sensor" in alerts.columns:
+            modis = alerts.sensor.astype(str).str.startswith("modis").to_numpy()
+        else:
+            modis = np.full(len(alerts), self.satsource.startswith("modis"))
+
+        return np.where(modis, param.PIXEL_SIZE["modis"], param.PIXEL_SIZE["viirs"])
+
     def get_confidence_items(self):
-        """Get the corresponding confidence items based on the satellite selection"""
+        """Get the confidence classes items with their number of alerts. The
+        discrete categories labels are used when only using MODIS"""
+
+        labels = param.CONFIDENCE_CLASSES
 
         # Modis satellite is using a discrete range of values ranging from 0-100
         # We have divided its values in three categories (view app.py)
+        if all(sensor.startswith("modis") for sensor in self.get_sensors()):
+            labels = [v[0] for _, v in sorted(param.CONFIDENCE["disc"].items())]
 
-        type_ = "disc" if self.satsource == "modis" else "cat"
-
-        confidence_by_sat = [
-            {"text": v[0], "value": k} for k, v in param.CONFIDENCE[type_].items()
+        items = [
+            {
+                "text": f"{label} ({len(self.confidence_index[conf_class])})",
+                "value": conf_class,
+            }
+            for label, conf_class in zip(labels, param.CONFIDENCE_CLASSES)
         ]
 
-        return ["All"] + confidence_by_sat
+        all_ = {"text": f"All ({len(self.confidence_index['All'])})", "value": "All"}
+
+        return [all_] + items[::-1]
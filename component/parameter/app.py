@@ -3,10 +3,55 @@ from component.message import cm
 __all__ = [
     "SAT_SOURCE",
     "CONFIDENCE",
+    "CONFIDENCE_CLASSES",
     "TIME_SPAN",
     "BAR_FORMAT",
     "MAX_ALERTS",
+    "PAGE_SIZE",
+    "TRAVERSAL_ORDERS",
+    "NEAREST_MAX_ALERTS",
+    "TILE_COLORS",
+    "TILE_CACHE_SIZE",
+    "TILE_MAX_LEVEL",
+    "AGGREGATE_ZOOMS",
+    "AGGREGATE_CELL",
+    "AGGREGATE_COLORS",
+    "COORDINATES_PRECISION",
+    "PAYLOAD_SAMPLE",
+    "WINDOW_CELL",
+    "WINDOW_MARGIN",
+    "WINDOW_DEBOUNCE",
     "METADATA_ROWS",
+    "SHAPEFILE_COLUMNS",
+    "COUNTRY_SIMPLIFY_TOLERANCE",
+    "COUNTRY_GRID_SIZE",
+    "TILE_SIZE",
+    "BBOX_PRECISION",
+    "MAX_WORKERS",
+    "CACHE_MAX_SIZE",
+    "NRT_CACHE_TTL",
+    "AVAILABILITY_TTL",
+    "PLANET_CACHE_ITEMS",
+    "PLANET_CACHE_MAX_SIZE",
+    "PLANET_CACHE_TTL",
+    "PLANET_SEARCH_PRECISION",
+    "PREFETCH_ALERTS",
+    "MAX_DAY_RANGE",
+    "ALERT_KEYS",
+    "ALERTS_SCHEMA",
+    "HTTP_TIMEOUT",
+    "HTTP_RETRIES",
+    "HTTP_BACKOFF",
+    "FIRMS_TRANSACTIONS",
+    "FIRMS_TRANSACTIONS_PERIOD",
+    "FUSED_COLUMNS",
+    "METERS_PER_DEGREE",
+    "PIXEL_SIZE",
+    "CORROBORATION_DISTANCE",
+    "CORROBORATION_TIME",
+    "EVENT_DISTANCE",
+    "EVENT_TIME",
+    "ARCHIVE_ROW_GROUP_SIZE",
 ]
 
 # sat_source and hard-coded start date from alerts.
@@ -39,6 +84,13 @@ CONFIDENCE = {
     "disc": {80: [">80", "green"], 50: [">50, <80", "orange"], 30: ["<50", "red"]},
 }
 
+# Common confidence classes of both sensors, from the lowest. The discrete
+# categories map to them in the same order
+CONFIDENCE_CLASSES = ["low", "nominal", "high"]
+
+# Maximum number of days that can be requested at once to the FIRMS API
+MAX_DAY_RANGE = 10
+
 # Time span for recent alerts
 TIME_SPAN = {
     "24h": cm.alerts.hour24,
@@ -50,17 +102,193 @@ TIME_SPAN.update({f"{i}d": f"{i} {cm.alerts.days}" for i in range(3, 11, 1)})
 # Specify format for the tqdm progress bar
 BAR_FORMAT = "{l_bar}{bar}{n_fmt}/{total_fmt}"
 
-# Maxiumum number of alerts to display on the map
+# Maxiumum number of alerts to display on the map as clickable squares, above it
+# they are rendered as raster tiles
 MAX_ALERTS = 20000
 
+# Number of alerts ids sent at once to the alerts navigator list
+PAGE_SIZE = 50
+
+# Orders in which the alerts navigator steps through the alerts: as received
+# from FIRMS, along a Hilbert curve or as a nearest neighbour tour
+TRAVERSAL_ORDERS = {
+    "firms": cm.alerts.order.firms,
+    "hilbert": cm.alerts.order.hilbert,
+    "nearest": cm.alerts.order.nearest,
+}
+
+# Maximum number of alerts ordered as a nearest neighbour tour (~1.5s for 50000
+# alerts in clusters), above it they are ordered along the Hilbert curve
+NEAREST_MAX_ALERTS = 50000
+
+# RGB values of the confidence colors in the raster tiles
+TILE_COLORS = {"green": (0, 128, 0), "orange": (255, 165, 0), "red": (255, 0, 0)}
+
+# Number of rendered tiles kept in memory
+TILE_CACHE_SIZE = 512
+
+# Zoom level of the spatial index of the alerts used to render the tiles
+TILE_MAX_LEVEL = 16
+
+# Zoom levels at which the alerts are displayed as grid cells aggregates, the
+# alerts squares are smaller than a pixel below the zoom level 9
+AGGREGATE_ZOOMS = list(range(0, 9))
+
+# Size (in pixels) of the aggregation cells, a power of 2
+AGGREGATE_CELL = 32
+
+# Colors of the confidence classes, from the lowest to the highest
+AGGREGATE_COLORS = ["red", "orange", "green"]
+
+# Number of decimals of the alerts squares coordinates sent to the map (~1m)
+COORDINATES_PRECISION = 5
+
+# Number of alerts serialized to estimate the size of the features sent to the map
+PAYLOAD_SAMPLE = 1000
+
+# Only the alerts around the map view are sent to the map: size (in degrees) of
+# the grid cells used to find them, margin around the view (as a share of its
+# size) and delay (in seconds) without map move before updating them
+WINDOW_CELL = 0.1
+WINDOW_MARGIN = 0.5
+WINDOW_DEBOUNCE = 0.3
+
+# dtypes of the FIRMS csv columns for each sensor layout. Float32 coordinates
+# are precise to ~1m, enough for 375m and 1km pixels. Columns missing from a
+# response are ignored.
+_COMMON_SCHEMA = {
+    "latitude": "float32",
+    "longitude": "float32",
+    "scan": "float32",
+    "track": "float32",
+    "acq_date": "category",
+    "acq_time": "int16",
+    "satellite": "category",
+    "instrument": "category",
+    "version": "category",
+    "frp": "float32",
+    "daynight": "category",
+    "type": "category",
+}
+
+ALERTS_SCHEMA = {
+    "modis": {
+        **_COMMON_SCHEMA,
+        "brightness": "float32",
+        "bright_t31": "float32",
+        # Discrete confidence ranging from 0-100
+        "confidence": "uint8",
+    },
+    "viirs": {
+        **_COMMON_SCHEMA,
+        "bright_ti4": "float32",
+        "bright_ti5": "float32",
+        # Categorical confidence (low, nominal, high)
+        "confidence": "category",
+    },
+}
+
+# VIIRS columns renamed to their MODIS equivalent when fusing several sensors
+FUSED_COLUMNS = {"bright_ti4": "brightness", "bright_ti5": "bright_t31"}
+
+# Approximate length of a degree of latitude
+METERS_PER_DEGREE = 111320
+
+# Size (in meters) of the pixels of each sensor at nadir, used to display the
+# alerts footprints
+PIXEL_SIZE = {"modis": 1000, "viirs": 375}
+
+# Detections of different sensors closer than a MODIS pixel (in meters) and
+# acquired within the given minutes are flagged as corroborated
+CORROBORATION_DISTANCE = 1000
+CORROBORATION_TIME = 60
+
+# Maximum distance (in meters) and time (in minutes) between two detections of
+# the same fire event: the diagonal of a MODIS pixel, and two days so a fire
+# hidden by clouds for a day is still the same event
+EVENT_DISTANCE = 1500
+EVENT_TIME = 2880
+
+# Columns identifying a single detection, used to drop duplicated alerts
+ALERT_KEYS = ["latitude", "longitude", "acq_date", "acq_time", "satellite"]
+
 # Columns to be retreived in the
 METADATA_ROWS = {
     "index": cm.alerts.metadata.index,
+    "aoi_id": cm.alerts.metadata.aoi_id,
+    "event_id": cm.alerts.metadata.event_id,
+    "event_size": cm.alerts.metadata.event_size,
+    "event_dates": cm.alerts.metadata.event_dates,
     "latitude": cm.alerts.metadata.latitude,
     "longitude": cm.alerts.metadata.longitude,
     "acq_date": cm.alerts.metadata.acq_date,
     "acq_time": cm.alerts.metadata.acq_time,
     "confidence": cm.alerts.metadata.confidence,
+    "sensor": cm.alerts.metadata.sensor,
+    "corroborated": cm.alerts.metadata.corroborated,
     "reviewed": cm.alerts.metadata.reviewed,
     "observ": cm.alerts.metadata.observation,
 }
+
+# Names of the exported columns longer than the 10 characters allowed in the
+# shapefiles fields
+SHAPEFILE_COLUMNS = {"acq_datetime": "acq_dt", "corroborated": "corrob"}
+
+# Tolerance and coordinates precision (in degrees) of the simplified countries
+# geometries displayed on the map
+COUNTRY_SIMPLIFY_TOLERANCE = 0.02
+COUNTRY_GRID_SIZE = 0.001
+
+# Size (in degrees) of the grid cells used to split large AOIs into several
+# FIRMS requests
+TILE_SIZE = 5
+
+# Precision (in degrees) of the bounds requested inside each grid cell, they are
+# rounded outwards to it
+BBOX_PRECISION = 0.1
+
+# Maximum number of concurrent requests sent to the FIRMS API
+MAX_WORKERS = 4
+
+# Timeout (in seconds) of the http requests
+HTTP_TIMEOUT = 120
+
+# Maximum number of retries of a failed http request, and time (in seconds) to
+# wait before the first retry. The waiting time doubles on each retry.
+HTTP_RETRIES = 3
+HTTP_BACKOFF = 1
+
+# FIRMS allows a limited number of transactions per MAP_KEY every 10 minutes
+FIRMS_TRANSACTIONS = 5000
+FIRMS_TRANSACTIONS_PERIOD = 10 * 60
+
+# Number of alerts of each row group of the parquet archive. Smaller groups
+# allow to skip more data when reading a date range or area.
+ARCHIVE_ROW_GROUP_SIZE = 10000
+
+# Maximum size (in bytes) of the FIRMS responses cache
+CACHE_MAX_SIZE = 200 * 1024**2
+
+# Time (in seconds) to keep near real time responses in the cache. Standard
+# processing (SP) sources won't change anymore, so they are never expired.
+NRT_CACHE_TTL = 60 * 60
+
+# Time (in seconds) to keep the FIRMS data availability of an api key in the cache
+AVAILABILITY_TTL = 60 * 60
+
+# Number of Planet searches kept in memory, and maximum size (in bytes) of the
+# ones kept on disk
+PLANET_CACHE_ITEMS = 256
+PLANET_CACHE_MAX_SIZE = 50 * 1024**2
+
+# Time (in seconds) to keep the Planet searches in the cache, new images are
+# published every day
+PLANET_CACHE_TTL = 6 * 60 * 60
+
+# Precision (in degrees) of the Planet search boxes, so the searches of the same
+# place share the same cache entry
+PLANET_SEARCH_PRECISION = 0.001
+
+# Number of alerts before and after the current one in the navigator whose Planet
+# items are searched in the background
+PREFETCH_ALERTS = 3
@@ -4,19 +4,29 @@ __all__ = [
     "base_dir",
     "root_dir",
     "data_dir",
+    "FIRMS_CACHE_DIR",
+    "PLANET_CACHE_DIR",
     "HISTORIC_DIR",
     "ALERTS_DIR",
+    "COUNTRIES_FILE",
 ]
 
 base_dir = Path("~", "module_results").expanduser()
 root_dir = base_dir / "sepafe"
 
 data_dir = root_dir / "data"
+FIRMS_CACHE_DIR = data_dir / "firms"
+PLANET_CACHE_DIR = data_dir / "planet"
 HISTORIC_DIR = root_dir / "historical"
 ALERTS_DIR = root_dir / "alerts"
 
+# Natural Earth 1:110m countries boundaries shipped with the module
+COUNTRIES_FILE = Path(__file__).parents[1] / "data" / "countries.parquet"
+
 base_dir.mkdir(exist_ok=True)
 root_dir.mkdir(parents=True, exist_ok=True)
 data_dir.mkdir(parents=True, exist_ok=True)
+FIRMS_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+PLANET_CACHE_DIR.mkdir(parents=True, exist_ok=True)
 HISTORIC_DIR.mkdir(parents=True, exist_ok=True)
 ALERTS_DIR.mkdir(parents=True, exist_ok=True)
@@ -13,7 +13,7 @@ PLANET_TILES_URL = (
     "https://tiles0.planet.com/data/v1/{}/{}/{{z}}/{{x}}/{{y}}.png?api_key={}"
 )
 
-# Use a light Countries geoJson file to improve speed of loading and clipping
-COUNTRIES_JSON = (
-    "https://raw.githubusercontent.com/johan/world.geo.json/master/countries.geo.json"
-)
+# {jupyter base url}, {port}, {layer id}: alerts tiles rendered by the kernel. The
+# browser may not run on the kernel machine, they are requested through the
+# jupyter-server-proxy route of the Jupyter server
+ALERTS_TILES_URL = "{}proxy/{}/{}/{{z}}/{{x}}/{{y}}.png"
@@ -1,2 +1,13 @@
+from .aggregation import *
+from .archive import *
+from .cache import *
+from .countries import *
+from .events import *
 from .firms_requests import *
+from .fusion import *
+from .http_client import *
+from .planet import *
+from .renderer import *
 from .scripts import *
+from .spatial import *
+from .tile_server import *
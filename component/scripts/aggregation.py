@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+import component.parameter as param
+
+__all__ = ["get_mercator", "get_aggregates", "get_cells_bounds"]
+
+
+def get_mercator(lon, lat):
+    """Get the Web Mercator coordinates of the points, normalized between 0 and 1
+    from the top left corner of the world"""
+
+    lon = np.asarray(lon, dtype="float64")
+    lat = np.clip(np.asarray(lat, dtype="float64"), -85.0511, 85.0511)
+
+    x = (lon + 180) / 360
+    y = 0.5 - np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)) / (2 * np.pi)
+
+    return x, y
+
+
+def get_aggregates(
+    lon, lat, ranks, frp, zooms=param.AGGREGATE_ZOOMS, cell_size=param.AGGREGATE_CELL
+):
+    """Aggregate the alerts in square grid cells for several zoom levels.
+
+    The alerts are only grouped once, in the cells of the highest zoom level,
+    the cells of the lower levels are then aggregated from the cells of the
+    level above.
+
+    Args:
+        lon (np.ndarray): longitudes of the alerts
+        lat (np.ndarray): latitudes of the alerts
+        ranks (np.ndarray): confidence class of each alert, from 0 (lowest)
+        frp (np.ndarray): fire radiative power of each alert
+        zooms (list): zoom levels to aggregate
+        cell_size (int): size of the cells in pixels, a power of 2
+
+    Returns:
+        dict: cells of each zoom level, as dataframes with the column and row of
+            the cells in the grid of level zoom + log2(256 / cell_size), the
+            number of alerts, the maximum confidence rank and the total frp
+    """
+
+    shift = int(np.log2(256 // cell_size))
+    zooms = sorted(zooms, reverse=True)
+
+    level = zooms[0] + shift
+    x, y = get_mercator(lon, lat)
+
+    n = 2**level
+    cells = pd.DataFrame(
+        {
+            "col": np.clip((x * n).astype("int64"), 0, n - 1),
+            "row": np.clip((y * n).astype("int64"), 0, n - 1),
+            "count": 1,
+            "rank": np.asarray(ranks),
+            "frp": np.asarray(frp, dtype="float64"),
+        }
+    )
+
+    aggregates = {}
+    for zoom in zooms:
+        factor = 2 ** (level - zoom - shift)
+        cells = cells.assign(col=cells.col // factor, row=cells.row // factor)
+        cells = cells.groupby(["col", "row"], as_index=False, sort=False).agg(
+            {"count": "sum", "rank": "max", "frp": "sum"}
+        )
+
+        level = zoom + shift
+        aggregates[zoom] = cells
+
+    return aggregates
+
+
+def get_cells_bounds(col, row, level):
+    """Get the (west, south, east, north) bounds of the cells of a Web Mercator
+    grid level
+
+    Args:
+        col (np.ndarray): columns of the cells
+        row (np.ndarray): rows of the cells
+        level (int): level of the grid, with 2**level cells on each side
+
+    Returns:
+        tuple of np.ndarray: west, south, east and north bounds
+    """
+
+    n = 2**level
+
+    def to_lat(row):
+        return np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * row / n))))
+
+    west = col / n * 360 - 180
+    east = (col + 1) / n * 360 - 180
+
+    return west, to_lat(row + 1), east, to_lat(row)
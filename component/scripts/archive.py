@@ -0,0 +1,215 @@
+import json
+import os
+import threading
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+import component.parameter as param
+
+__all__ = ["AlertsArchive"]
+
+
+class AlertsArchive:
+    """Local GeoParquet archive of the downloaded FIRMS alerts.
+
+    Alerts are partitioned by FIRMS source and acquisition month
+    (sensor=<source>/month=<YYYY-MM>/part-<id>.parquet) and sorted by date so the
+    row groups statistics can be used to only read the requested dates and bounds.
+    A coverage file keeps track of the bounds downloaded for each source and date,
+    including the ones without any alert.
+
+    Args:
+        directory (Path): folder of the archive
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        self.coverage_file = self.directory / "coverage.json"
+        self.lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        try:
+            self.coverage = json.loads(self.coverage_file.read_text())
+        except (FileNotFoundError, ValueError):
+            self.coverage = {}
+
+    @staticmethod
+    def _contains(outer, inner):
+        """Check if the outer (west, south, east, north) bounds contain the inner"""
+
+        return (
+            outer[0] <= inner[0]
+            and outer[1] <= inner[1]
+            and outer[2] >= inner[2]
+            and outer[3] >= inner[3]
+        )
+
+    def get_gaps(self, sat_source, bounds, dates):
+        """Get the dates that have not been archived yet for the given bounds
+
+        Args:
+            sat_source (str): FIRMS source name
+            bounds (tuple): (west, south, east, north) bounds
+            dates (list): YYYY-MM-DD dates
+
+        Returns:
+            list: the missing dates
+        """
+
+        coverage = self.coverage.get(sat_source, {})
+
+        return [
+            day
+            for day in dates
+            if not any(self._contains(b, bounds) for b in coverage.get(day, []))
+        ]
+
+    def write(self, sat_source, df, bounds, dates):
+        """Archive the alerts downloaded for the given bounds and dates.
+
+        Only the dates that won't receive new detections anymore (before
+        yesterday, UTC) and that are not archived yet for these bounds are
+        written, so writing the same alerts again does nothing.
+
+        Args:
+            sat_source (str): FIRMS source name
+            df (pd.DataFrame): alerts as returned by the FIRMS API
+            bounds (tuple): (west, south, east, north) bounds of the request
+            dates (list): YYYY-MM-DD dates of the request
+        """
+
+        today = datetime.now(timezone.utc).date()
+        dates = [
+            day for day in dates if date.fromisoformat(day) < today - timedelta(days=1)
+        ]
+
+        # Check and update the coverage at once so concurrent writes of the same
+        # bounds and dates are only archived once
+        with self.lock:
+            dates = self.get_gaps(sat_source, bounds, dates)
+
+            if dates:
+                self._write(sat_source, df, dates)
+
+                coverage = self.coverage.setdefault(sat_source, {})
+                for day in dates:
+                    coverage.setdefault(day, []).append(list(bounds))
+
+                tmp = self.coverage_file.with_suffix(f".{threading.get_ident()}.tmp")
+                tmp.write_text(json.dumps(self.coverage))
+                os.replace(tmp, self.coverage_file)
+
+    def _write(self, sat_source, df, dates):
+        """Write the alerts of the given dates in the monthly partitions"""
+
+        acq_date = df.acq_date.astype(str)
+        df = df[acq_date.isin(dates)]
+        acq_date = acq_date[acq_date.isin(dates)]
+
+        # Sort by date so each row group covers a short range of dates
+        order = np.lexsort((df.latitude.to_numpy(), acq_date.to_numpy(dtype="U10")))
+        df, acq_date = df.iloc[order], acq_date.iloc[order]
+
+        for month, part in df.groupby(acq_date.str[:7].to_numpy()):
+            folder = self.directory / f"sensor={sat_source}" / f"month={month}"
+            folder.mkdir(parents=True, exist_ok=True)
+
+            gdf = gpd.GeoDataFrame(
+                part,
+                geometry=gpd.points_from_xy(part.longitude, part.latitude),
+                crs="EPSG:4326",
+            )
+            gdf.to_parquet(
+                folder / f"part-{uuid.uuid4().hex}.parquet",
+                index=False,
+                row_group_size=param.ARCHIVE_ROW_GROUP_SIZE,
+            )
+
+    def read(self, sat_source, bounds, dates):
+        """Read the archived alerts of the given bounds and dates
+
+        Args:
+            sat_source (str): FIRMS source name
+            bounds (tuple): (west, south, east, north) bounds
+            dates (list): YYYY-MM-DD dates
+
+        Returns:
+            pd.DataFrame or None: the archived alerts, None if there are none
+        """
+
+        if not dates:
+            return None
+
+        west, south, east, north = bounds
+        ranges = {
+            "acq_date": (min(dates), max(dates)),
+            "latitude": (south, north),
+            "longitude": (west, east),
+        }
+
+        frames = []
+        for month in sorted({day[:7] for day in dates}):
+            folder = self.directory / f"sensor={sat_source}" / f"month={month}"
+
+            for path in sorted(folder.glob("*.parquet")):
+                file = pq.ParquetFile(path)
+
+                groups = [
+                    i
+                    for i in range(file.num_row_groups)
+                    if self._overlaps(file.metadata.row_group(i), ranges)
+                ]
+
+                if not groups:
+                    continue
+
+                # Points are rebuilt from the coordinates, skip the geometries
+                columns = [c for c in file.schema_arrow.names if c != "geometry"]
+                table = file.read_row_groups(groups, columns=columns)
+                frames.append(table.to_pandas())
+
+        if not frames:
+            return None
+
+        # Overlapping bounds archived separately share some alerts
+        df = pd.concat(frames, ignore_index=True).drop_duplicates(ignore_index=True)
+
+        mask = (
+            df.acq_date.astype(str).isin(dates)
+            & df.latitude.between(south, north)
+            & df.longitude.between(west, east)
+        )
+
+        return df[mask.to_numpy()]
+
+    @staticmethod
+    def _overlaps(row_group, ranges):
+        """Check from its statistics if a row group can contain values in the
+        given (min, max) ranges of its columns"""
+
+        for i in range(row_group.num_columns):
+            column = row_group.column(i)
+            stats = column.statistics
+
+            if column.path_in_schema not in ranges:
+                continue
+
+            if stats is None or not stats.has_min_max:
+                continue
+
+            low, high = ranges[column.path_in_schema]
+            if stats.max < low or stats.min > high:
+                return False
+
+        return True
+
+
+ALERTS_ARCHIVE = AlertsArchive(param.HISTORIC_DIR)
+"AlertsArchive: archive of all the downloaded alerts"
@@ -0,0 +1,240 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+__all__ = ["DiskCache", "LRUCache"]
+
+
+class DiskCache:
+    """Persistent key/value cache storing gzip compressed text files in a folder.
+
+    Entries can expire after a time to live (ttl) set when reading them, and the
+    least recently used ones are evicted when the folder grows over max_size.
+
+    Args:
+        directory (Path): folder where the cached files will be stored
+        max_size (int): maximum size of the cache folder in bytes
+    """
+
+    def __init__(self, directory, max_size):
+        self.directory = Path(directory)
+        self.max_size = max_size
+
+        # Size of the folder, updated by each write and measured again when
+        # evicting. None until the first eviction.
+        self.size = None
+        self.lock = threading.Lock()
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key):
+        """Get the file path of a key. The key can be any json serializable object"""
+
+        hash_ = hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+        return self.directory / f"{hash_}.gz"
+
+    def get(self, key, ttl=None):
+        """Read a cached value
+
+        Args:
+            key (any): json serializable key of the entry
+            ttl (int, optional): maximum age in seconds of the entry. If None, the
+                entry never expires.
+
+        Returns:
+            str or None: the cached text, None if it's missing or expired
+        """
+
+        path = self._path(key)
+
+        try:
+            stat = path.stat()
+
+            # The modification time is the time when the entry was written
+            if ttl is not None and time.time() - stat.st_mtime > ttl:
+                path.unlink(missing_ok=True)
+                return None
+
+            text = gzip.decompress(path.read_bytes()).decode()
+
+            # Use the access time to keep track of the least recently used entries
+            os.utime(path, (time.time(), stat.st_mtime))
+
+        # The entry can be evicted by another thread at any time
+        except (FileNotFoundError, OSError, EOFError):
+            return None
+
+        return text
+
+    def set(self, key, text):
+        """Write a value in the cache and evict old entries if it grows over
+        max_size
+
+        Args:
+            key (any): json serializable key of the entry
+            text (str): value to store
+        """
+
+        path = self._path(key)
+        data = gzip.compress(text.encode())
+
+        try:
+            replaced = path.stat().st_size
+        except FileNotFoundError:
+            replaced = 0
+
+        # Write in a temporary file first so concurrent readers never get a
+        # partially written entry
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+        # Only list the entries when the cache may be full
+        with self.lock:
+            if self.size is not None:
+                self.size += len(data) - replaced
+            full = self.size is None or self.size > self.max_size
+
+        if full:
+            self.evict()
+
+    def evict(self):
+        """Remove the least recently used entries when the cache is over max_size,
+        leaving 10% of free room so the next writes don't evict again"""
+
+        entries = []
+        for path in self.directory.glob("*.gz"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, path))
+
+        size = sum(entry[1] for entry in entries)
+        target = self.max_size if size <= self.max_size else self.max_size * 0.9
+
+        for _, entry_size, path in sorted(entries, key=lambda entry: entry[0]):
+            if size <= target:
+                break
+
+            path.unlink(missing_ok=True)
+            size -= entry_size
+
+        with self.lock:
+            self.size = size
+
+    def clear(self):
+        """Remove all the cached entries"""
+
+        for path in self.directory.glob("*.gz"):
+            path.unlink(missing_ok=True)
+
+        with self.lock:
+            self.size = 0
+
+
+class LRUCache:
+    """In memory cache of json serializable values, keeping the max_items most
+    recently used entries. Missing entries are looked for in an optional
+    DiskCache, so they survive the session.
+
+    The number of hits of each tier and of misses are counted to follow the
+    efficiency of the cache.
+
+    Args:
+        max_items (int): maximum number of entries kept in memory
+        disk (DiskCache, optional): persistent tier of the cache
+    """
+
+    def __init__(self, max_items, disk=None):
+        self.max_items = max_items
+        self.disk = disk
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key, ttl=None):
+        """Read a cached value, from memory or from the disk
+
+        Args:
+            key (any): json serializable key of the entry
+            ttl (int, optional): maximum age in seconds of the entry. If None, the
+                entry never expires.
+
+        Returns:
+            any or None: the cached value, None if it's missing or expired
+        """
+
+        id_ = json.dumps(key, sort_keys=True)
+
+        with self.lock:
+            if id_ in self.entries:
+                written, value = self.entries[id_]
+
+                if ttl is None or time.time() - written <= ttl:
+                    self.entries.move_to_end(id_)
+                    self.hits += 1
+                    return value
+
+                del self.entries[id_]
+
+        text = self.disk.get(key, ttl) if self.disk else None
+
+        if text is None:
+            with self.lock:
+                self.misses += 1
+            return None
+
+        value = json.loads(text)
+        self._remember(id_, value)
+
+        with self.lock:
+            self.disk_hits += 1
+
+        return value
+
+    def set(self, key, value):
+        """Write a value in memory and on the disk
+
+        Args:
+            key (any): json serializable key of the entry
+            value (any): json serializable value to store
+        """
+
+        self._remember(json.dumps(key, sort_keys=True), value)
+
+        if self.disk:
+            self.disk.set(key, json.dumps(value))
+
+    def _remember(self, id_, value):
+        """Keep a value in memory, evicting the least recently used one if full"""
+
+        with self.lock:
+            self.entries[id_] = (time.time(), value)
+            self.entries.move_to_end(id_)
+
+            if len(self.entries) > self.max_items:
+                self.entries.popitem(last=False)
+
+    def get_stats(self):
+        """Get the number of hits in memory and on the disk, and of misses"""
+
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+    def clear(self):
+        """Remove all the cached entries, in memory and on the disk"""
+
+        with self.lock:
+            self.entries.clear()
+
+        if self.disk:
+            self.disk.clear()
@@ -0,0 +1,110 @@
+import json
+
+import geopandas as gpd
+import pyarrow.parquet as pq
+import shapely
+
+import component.parameter as param
+
+__all__ = ["get_country_names", "get_country"]
+
+COUNTRIES = None
+"dict: the cached geometries and GeoJSON payloads of the countries, keyed by name"
+
+
+def get_country_names():
+    """Get the sorted names of the countries, without reading their geometries"""
+
+    table = pq.read_table(param.COUNTRIES_FILE, columns=["name"])
+
+    return table.column("name").to_pylist()
+
+
+def get_country(name):
+    """Get the cached geometries of a country. All the countries are read from the
+    bundled file and prepared the first time a country is selected, so switching
+    countries afterwards doesn't cost any geometry work.
+
+    The GeoJSON feature collections are parsed from the cached text and the
+    geodataframe is built at each call, so changing them doesn't change the cache.
+
+    Args:
+        name (str): name of the country
+
+    Returns:
+        dict: with the following keys:
+            - data: exact GeoJSON feature collection, used as aoi
+            - gdf: exact geodataframe of the feature collection, used for
+              clipping
+            - display: simplified GeoJSON feature collection, sent to the map
+            - bounds: (west, south, east, north) bounds of the country
+            - center: (lat, lon) of the centroid of the country
+    """
+
+    global COUNTRIES
+
+    if COUNTRIES is None:
+        COUNTRIES = load_countries(gpd.read_parquet(param.COUNTRIES_FILE))
+
+    country = COUNTRIES[name]
+
+    return {
+        "data": get_feature_collection(country["data"], country["properties"]),
+        "gdf": gpd.GeoDataFrame(
+            [country["properties"]], geometry=[country["geometry"]], crs="EPSG:4326"
+        ),
+        "display": get_feature_collection(country["display"], country["properties"]),
+        "bounds": country["bounds"],
+        "center": country["center"],
+    }
+
+
+def load_countries(countries):
+    """Precompute the exact and display geometries and payloads of the countries
+
+    Args:
+        countries (gpd.GeoDataFrame): name, iso_a3 and geometry of the countries
+    """
+
+    geometries = countries.geometry.values
+
+    # Topology preserving simplification, quantized to ~100m. It's only used to
+    # display the country on the map, clipping uses the exact geometry
+    display = shapely.set_precision(
+        shapely.simplify(
+            geometries, param.COUNTRY_SIMPLIFY_TOLERANCE, preserve_topology=True
+        ),
+        param.COUNTRY_GRID_SIZE,
+    )
+
+    exact_json = shapely.to_geojson(geometries)
+    display_json = shapely.to_geojson(display)
+    centroids = shapely.centroid(geometries)
+
+    cache = {}
+    for i, (name, iso_a3) in enumerate(zip(countries.name, countries.iso_a3)):
+        cache[name] = {
+            "geometry": geometries[i],
+            "properties": {"name": name, "iso_a3": iso_a3},
+            "data": exact_json[i],
+            "display": display_json[i],
+            "bounds": geometries[i].bounds,
+            "center": (centroids[i].y, centroids[i].x),
+        }
+
+    return cache
+
+
+def get_feature_collection(geometry, properties):
+    """Wrap a GeoJSON geometry string in a single feature collection"""
+
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": dict(properties),
+                "geometry": json.loads(geometry),
+            }
+        ],
+    }
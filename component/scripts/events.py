@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+import component.parameter as param
+from component.scripts.spatial import get_close_pairs
+
+__all__ = ["get_events", "get_components"]
+
+
+def get_events(df, distance=param.EVENT_DISTANCE, max_time=param.EVENT_TIME):
+    """Group the detections of the same fire into events: two detections belong
+    to the same event when they are linked by a chain of detections closer than
+    the distance and the time tolerances.
+
+    The links are the close pairs of component.scripts.spatial.get_close_pairs,
+    like the corroboration of the detections, and the events are the connected
+    components of the links.
+
+    Args:
+        df (pd.DataFrame): alerts with latitude, longitude and acq_datetime columns
+        distance (float): maximum distance in meters between linked detections
+        max_time (float): maximum time in minutes between linked detections
+
+    Returns:
+        np.ndarray: event id of each row, numbered from 0 in order of appearance
+    """
+
+    if df.empty:
+        return np.array([], dtype="int64")
+
+    lat = df.latitude.to_numpy(dtype="float64")
+    lon = df.longitude.to_numpy(dtype="float64")
+
+    epoch = pd.Timestamp(0, tz="UTC")
+    minutes = ((df.acq_datetime - epoch) // pd.Timedelta(minutes=1)).to_numpy()
+
+    sources, targets = get_close_pairs(lat, lon, minutes, distance, max_time)
+    labels = get_components(len(df), sources, targets)
+
+    return pd.factorize(labels)[0]
+
+
+def get_components(n, sources, targets):
+    """Label the connected components of a graph with the smallest node of each
+    component.
+
+    Each node takes the smallest label of its neighbours and then the label of
+    its label (pointer jumping), until no label changes. Every pass is a few
+    vectorized operations over the links.
+
+    Args:
+        n (int): number of nodes
+        sources (np.ndarray): first node of each link
+        targets (np.ndarray): second node of each link
+
+    Returns:
+        np.ndarray: label of each node
+    """
+
+    labels = np.arange(n)
+
+    while True:
+        new_labels = labels.copy()
+        np.minimum.at(new_labels, sources, labels[targets])
+        np.minimum.at(new_labels, targets, labels[sources])
+
+        # Hook the labels themselves, then shortcut the chains of labels
+        np.minimum.at(new_labels, labels, new_labels)
+        while True:
+            jumped = new_labels[new_labels]
+            if np.array_equal(jumped, new_labels):
+                break
+            new_labels = jumped
+
+        if np.array_equal(new_labels, labels):
+            return labels
+
+        labels = new_labels
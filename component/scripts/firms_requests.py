@@ -1,28 +1,320 @@
+import io
+import math
 import os
 
+import numpy as np
 import pandas as pd
-import requests
+import shapely
+from shapely.geometry import box
 
 import component.parameter as param
 from component.message import cm
+from component.scripts.cache import DiskCache
+from component.scripts.http_client import FIRMS_CLIENT
+from component.scripts.spatial import split_antimeridian
+
+__all__ = [
+    "get_availability",
+    "get_tiles",
+    "get_outer_bounds",
+    "get_area_saving",
+    "format_bounds",
+    "get_cache_ttl",
+    "read_alerts",
+    "get_schema",
+    "get_empty_alerts",
+    "apply_schema",
+    "add_acq_datetime",
+    "format_acq_time",
+]
+
+ALERTS_CACHE = DiskCache(param.FIRMS_CACHE_DIR, param.CACHE_MAX_SIZE)
+"DiskCache: cache of the FIRMS alerts responses"
+
+AVAILABILITY_CACHE = DiskCache(param.FIRMS_CACHE_DIR / "availability", 1024**2)
+"DiskCache: cache of the FIRMS data availability responses, keyed by api key"
 
 
 def get_availability(firms_key):
-    """request data availability (dates) from a request on the fly.
+    """request data availability (dates) from a request on the fly. The response
+    is kept in the cache for AVAILABILITY_TTL seconds for each api key.
 
     Args:
         firms_key (str, optional): api key if not found environment key.
+
+    Returns:
+        dict: (min_date, max_date) of each FIRMS source, keyed by data_id
     """
 
     if not firms_key:
         raise Exception(cm.alerts.auth.errors.no_value)
 
-    request_url = param.AVAILABILITY_URL.format(firms_key)
-    response = requests.get(request_url)
+    text = AVAILABILITY_CACHE.get(firms_key, param.AVAILABILITY_TTL)
+
+    if text is None:
+        request_url = param.AVAILABILITY_URL.format(firms_key)
+        text = FIRMS_CLIENT.get(request_url, firms_key).text
+
+        # It will return code "200" even if the key doesn't work. let's use the
+        # content to determine if the connection was successfull
+        if text == "Invalid MAP_KEY.":
+            raise Exception(cm.alerts.auth.errors.invalid_firms_key)
+
+        AVAILABILITY_CACHE.set(firms_key, text)
+
+    data = pd.read_csv(io.StringIO(text))
+
+    return {
+        row.data_id: (row.min_date, row.max_date)
+        for row in data.itertuples(index=False)
+    }
+
+
+def get_tiles(aoi_gdf, tile_size=param.TILE_SIZE, precision=param.BBOX_PRECISION):
+    """Split the area of interest into a grid of sub-boxes and keep only the ones
+    touching the aoi geometry, each of them shrunk to the bounds of the aoi part
+    it contains.
+
+    Fragmented aois (archipelagos) and aois crossing the antimeridian are
+    requested as a set of tight boxes instead of a single box covering the sea
+    in between.
+
+    Args:
+        aoi_gdf (gpd.GeoDataFrame): area of interest in EPSG:4326
+        tile_size (int, float): size of the grid cells in degrees
+        precision (float): the sub-boxes bounds are rounded outwards to it
+
+    Returns:
+        list of tuples: (west, south, east, north) bounds of each sub-box
+    """
+
+    aoi = shapely.union_all(
+        [split_antimeridian(geom) for geom in aoi_gdf.geometry.values]
+    )
+    shapely.prepare(aoi)
+
+    minx, miny, maxx, maxy = get_outer_bounds(aoi.bounds)
+
+    tiles = []
+    for west in np.arange(minx, maxx, tile_size):
+        for south in np.arange(miny, maxy, tile_size):
+            cell = (
+                float(west),
+                float(south),
+                float(min(west + tile_size, maxx)),
+                float(min(south + tile_size, maxy)),
+            )
+
+            # Sub-boxes that don't touch the aoi won't contain any alert
+            if not aoi.intersects(box(*cell)):
+                continue
+
+            part = shapely.clip_by_rect(aoi, *cell)
+            if part.is_empty:
+                continue
+
+            # Never go beyond the grid cell, so the sub-boxes don't overlap
+            tile = get_outer_bounds(part.bounds, precision)
+            tile = (
+                max(tile[0], cell[0]),
+                max(tile[1], cell[1]),
+                min(tile[2], cell[2]),
+                min(tile[3], cell[3]),
+            )
+
+            # Aois only touching the cell edges are covered by the next cells
+            if tile[0] < tile[2] and tile[1] < tile[3]:
+                tiles.append(tile)
+
+    return tiles
+
+
+def get_outer_bounds(bounds, precision=1):
+    """Round (west, south, east, north) bounds outwards to the given precision"""
+
+    west, south, east, north = bounds
+
+    def round_to(x, func):
+        return round(func(round(x / precision, 9)) * precision, 9)
+
+    return (
+        round_to(west, math.floor),
+        round_to(south, math.floor),
+        round_to(east, math.ceil),
+        round_to(north, math.ceil),
+    )
+
+
+def get_area(bounds):
+    """Get the approximate area (in square degrees at the equator) of
+    (west, south, east, north) bounds, taking the meridians convergence into
+    account"""
+
+    west, south, east, north = bounds
+    lat = math.radians((south + north) / 2)
+
+    return (east - west) * (north - south) * math.cos(lat)
+
+
+def get_area_saving(aoi_gdf, tiles):
+    """Get the share of the area of the aoi bounding box that is not requested
+    when using the given sub-boxes
+
+    Args:
+        aoi_gdf (gpd.GeoDataFrame): area of interest in EPSG:4326
+        tiles (list): sub-boxes bounds, see get_tiles
+
+    Returns:
+        float: saved share of the area, between 0 and 1
+    """
+
+    aoi = shapely.union_all(
+        [split_antimeridian(geom) for geom in aoi_gdf.geometry.values]
+    )
+    naive_area = get_area(get_outer_bounds(aoi.bounds))
+
+    if not naive_area:
+        return 0.0
+
+    return max(0.0, 1 - sum(get_area(tile) for tile in tiles) / naive_area)
+
+
+def format_bounds(bounds):
+    """Format (west, south, east, north) bounds as expected by the FIRMS API"""
+
+    return ",".join(f"{x:g}" for x in bounds)
+
+
+def get_cache_ttl(sat_source, end_date=None, max_date=None):
+    """Get the time to live of the cached responses of a FIRMS source
+
+    Args:
+        sat_source (str): FIRMS source name, one of the param.SAT_SOURCE values
+        end_date (str, optional): last date (YYYY-MM-DD) of the request
+        max_date (str, optional): last date (YYYY-MM-DD) published for the source,
+            see get_availability
+
+    Returns:
+        int or None: ttl in seconds, None if the responses never expire
+    """
+
+    # Standard processing sources are immutable once published, the near real
+    # time ones and the dates not published yet get new detections
+    published = end_date is not None and max_date is not None and end_date <= max_date
+
+    return None if sat_source.endswith("_SP") and published else param.NRT_CACHE_TTL
+
+
+def read_alerts(url, key=None, ttl=None, dtype=None, firms_key=None, callback=None):
+    """Read the alerts of a FIRMS url, using the cached response when available.
+
+    Args:
+        url (str): FIRMS area request url
+        key (any, optional): json serializable key identifying the request in the
+            cache. If None, the cache is not used.
+        ttl (int, optional): time to live of the cached response in seconds
+        dtype (dict, optional): dtypes of the columns, see get_schema
+        firms_key (str, optional): api key used in the url
+        callback (callable, optional): function called with the alerts when they
+            are downloaded, but not when they are read from the cache
+
+    Returns:
+        pd.DataFrame: the requested alerts
+    """
+
+    text = ALERTS_CACHE.get(key, ttl) if key is not None else None
+    downloaded = text is None
+
+    if downloaded:
+        text = FIRMS_CLIENT.get(url, firms_key).text
+
+        # Errors are returned as plain text messages with a "200" code. Don't
+        # keep them in the cache.
+        if not text.startswith("latitude"):
+            raise Exception(cm.alerts.errors.firms_request.format(text.strip()))
+
+        if key is not None:
+            ALERTS_CACHE.set(key, text)
+
+    df = pd.read_csv(io.StringIO(text), dtype=dtype)
+
+    if downloaded and callback:
+        callback(df)
+
+    return df
+
+
+def get_schema(sat_source):
+    """Get the dtypes of the alerts columns of a FIRMS source
+
+    Args:
+        sat_source (str): FIRMS source name, one of the param.SAT_SOURCE values
+    """
+
+    layout = "modis" if sat_source.startswith("MODIS") else "viirs"
+
+    return param.ALERTS_SCHEMA[layout]
+
+
+def get_empty_alerts(schema):
+    """Get an empty alerts dataframe with the columns of the schema"""
+
+    return pd.DataFrame({col: pd.Series(dtype=dtype) for col, dtype in schema.items()})
+
+
+def apply_schema(df, schema):
+    """Cast the columns of the dataframe to the schema dtypes.
+
+    Concatenating categorical columns with different categories falls back to
+    object columns, use it to restore them.
+
+    Args:
+        df (pd.DataFrame): alerts dataframe
+        schema (dict): dtypes of the columns, see get_schema
+    """
+
+    dtypes = {
+        col: dtype
+        for col, dtype in schema.items()
+        if col in df.columns and df[col].dtype != dtype
+    }
+
+    return df.astype(dtypes) if dtypes else df
+
+
+def add_acq_datetime(df):
+    """Add a UTC acq_datetime column built from the acq_date and acq_time
+    (HHMM integer) columns of the alerts
+
+    Args:
+        df (pd.DataFrame): alerts dataframe
+    """
+
+    # Only parse each distinct date once
+    dates = df.acq_date.astype("category")
+    days = pd.to_datetime(dates.cat.categories, format="%Y-%m-%d", utc=True)
+    days = days.take(dates.cat.codes.to_numpy())
+
+    time = df.acq_time.to_numpy().astype("int32")
+    minutes = pd.to_timedelta(time // 100 * 60 + time % 100, unit="min")
+
+    df["acq_datetime"] = days + minutes
+
+    return df
+
+
+def format_acq_time(acq_time):
+    """Format the HHMM integer acquisition times as HH:MM strings
+
+    Args:
+        acq_time (pd.Series): acquisition times
+
+    Returns:
+        pd.Categorical: formatted times
+    """
+
+    # There are at most 1440 distinct times, only format those
+    codes, uniques = pd.factorize(acq_time)
+    labels = [f"{time // 100:02d}:{time % 100:02d}" for time in uniques]
 
-    # It will return code "200" even if the key doesn't work. let's use the content
-    # to determine if the connection was successfull
-    if response.text != "Invalid MAP_KEY.":
-        return pd.read_csv(request_url)
-    else:
-        raise Exception(cm.alerts.auth.errors.invalid_firms_key)
+    return pd.Categorical.from_codes(codes, labels)
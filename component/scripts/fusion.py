@@ -0,0 +1,84 @@
+import numpy as np
+import pandas as pd
+
+import component.parameter as param
+from component.scripts.spatial import get_close_pairs
+
+__all__ = ["normalize_alerts", "fuse_alerts", "get_corroborated"]
+
+
+def normalize_alerts(df, satsource):
+    """Rename the sensor specific columns of the alerts to the common schema and
+    tag them with their sensor
+
+    Args:
+        df (pd.DataFrame): alerts of a single FIRMS source
+        satsource (str): key of the source, as in param.SAT_SOURCE
+    """
+
+    df = df.rename(columns=param.FUSED_COLUMNS)
+
+    # MODIS (0-100) and VIIRS (l, n, h) confidences can only share a text column
+    df["confidence"] = df.confidence.astype(str)
+    df["sensor"] = satsource
+
+    return df
+
+
+def fuse_alerts(frames):
+    """Merge the normalized alerts of several sensors and flag the detections
+    corroborated by another sensor
+
+    Args:
+        frames (list of pd.DataFrame): normalized alerts of each sensor
+
+    Returns:
+        pd.DataFrame: the fused alerts with a boolean corroborated column
+    """
+
+    df = pd.concat(frames, ignore_index=True)
+    df = df.astype({"confidence": "category", "sensor": "category"})
+
+    df["corroborated"] = get_corroborated(df)
+
+    return df
+
+
+def get_corroborated(
+    df, distance=param.CORROBORATION_DISTANCE, max_time=param.CORROBORATION_TIME
+):
+    """Flag the detections that have a detection from another sensor within a pixel
+    footprint and a short time window.
+
+    Close pairs of detections are found with component.scripts.spatial.get_close_pairs
+    and the ones of 2 different sensors flag both detections.
+
+    Args:
+        df (pd.DataFrame): alerts with latitude, longitude, acq_datetime and sensor
+            columns
+        distance (float): maximum distance in meters between the detections
+        max_time (float): maximum time in minutes between the detections
+
+    Returns:
+        np.ndarray: boolean flag of each row
+    """
+
+    flags = np.zeros(len(df), dtype=bool)
+
+    if df.empty:
+        return flags
+
+    lat = df.latitude.to_numpy(dtype="float64")
+    lon = df.longitude.to_numpy(dtype="float64")
+
+    sensor = pd.factorize(df.sensor)[0]
+    epoch = pd.Timestamp(0, tz="UTC")
+    minutes = ((df.acq_datetime - epoch) // pd.Timedelta(minutes=1)).to_numpy()
+
+    i, j = get_close_pairs(lat, lon, minutes, distance, max_time)
+    match = sensor[i] != sensor[j]
+
+    flags[i[match]] = True
+    flags[j[match]] = True
+
+    return flags
@@ -0,0 +1,144 @@
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import component.parameter as param
+
+__all__ = ["TokenBucket", "HttpClient"]
+
+
+class TokenBucket:
+    """Thread-safe token bucket rate limiter
+
+    Args:
+        capacity (int): maximum number of tokens, i.e. of requests in a burst
+        period (float): time in seconds to refill the whole bucket
+    """
+
+    def __init__(self, capacity, period):
+        self.capacity = capacity
+        self.rate = capacity / period
+
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, waiting until one is available"""
+
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class HttpClient:
+    """HTTP client sharing a pool of keep-alive connections between threads. It
+    retries transient errors with an exponential backoff and limits the number of
+    requests sent with each api key.
+
+    Args:
+        pool_size (int): maximum number of connections kept alive per host
+        retries (int): maximum number of retries of a request
+        backoff (float): time in seconds to wait before the first retry, doubled
+            on each retry
+        transactions (int): maximum number of requests per api key in a period
+        period (float): time in seconds of the transactions period
+    """
+
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+    "tuple: status codes of the transient errors"
+
+    def __init__(
+        self,
+        pool_size=param.MAX_WORKERS,
+        retries=param.HTTP_RETRIES,
+        backoff=param.HTTP_BACKOFF,
+        transactions=param.FIRMS_TRANSACTIONS,
+        period=param.FIRMS_TRANSACTIONS_PERIOD,
+    ):
+        self.retries = retries
+        self.backoff = backoff
+        self.transactions = transactions
+        self.period = period
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.buckets = {}
+        self.counters = {"requests": 0, "retries": 0, "bytes": 0}
+        self.lock = threading.Lock()
+
+    def _count(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def _get_bucket(self, key):
+        with self.lock:
+            if key not in self.buckets:
+                self.buckets[key] = TokenBucket(self.transactions, self.period)
+
+            return self.buckets[key]
+
+    def get(self, url, key=None):
+        """Send a GET request
+
+        Args:
+            url (str): url to request
+            key (str, optional): api key used in the request, to respect its
+                transactions limit
+
+        Returns:
+            requests.Response: the response of the request
+        """
+
+        for attempt in range(self.retries + 1):
+            if key:
+                self._get_bucket(key).acquire()
+
+            try:
+                response = self.session.get(url, timeout=param.HTTP_TIMEOUT)
+
+                self._count("requests")
+                self._count("bytes", len(response.content))
+
+                if response.status_code not in self.RETRY_STATUS:
+                    response.raise_for_status()
+                    return response
+
+                error = requests.HTTPError(response=response)
+
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._count("requests")
+                error = e
+
+            if attempt == self.retries:
+                raise error
+
+            self._count("retries")
+            time.sleep(self.backoff * 2**attempt)
+
+    def stats(self):
+        """Get a copy of the requests, retries and bytes counters"""
+
+        with self.lock:
+            return dict(self.counters)
+
+
+FIRMS_CLIENT = HttpClient()
+"HttpClient: client used for all the requests sent to the FIRMS API"
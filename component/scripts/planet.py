@@ -0,0 +1,141 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import shapely
+from shapely.geometry import box
+
+import component.parameter as param
+from component.scripts.cache import DiskCache, LRUCache
+from component.scripts.firms_requests import get_outer_bounds
+
+__all__ = [
+    "PLANET_CACHE",
+    "PLANET_PREFETCHER",
+    "get_planet_key",
+    "get_planet_items",
+    "PlanetPrefetcher",
+]
+
+PLANET_CACHE = LRUCache(
+    param.PLANET_CACHE_ITEMS,
+    DiskCache(param.PLANET_CACHE_DIR, param.PLANET_CACHE_MAX_SIZE),
+)
+"LRUCache: cache of the Planet items searches"
+
+SEARCH_LOCK = threading.Lock()
+"threading.Lock: lock of the Planet searches, their session can't be shared by threads"
+
+
+def get_planet_key(bounds, start, end, cloud_cover):
+    """Normalize the parameters of a Planet search to identify it in the cache.
+
+    The bounds are rounded outwards to param.PLANET_SEARCH_PRECISION, so close
+    searches share the same cache entry.
+
+    Args:
+        bounds (tuple): (west, south, east, north) bounds of the search
+        start (datetime.datetime): first date of the search
+        end (datetime.datetime): last date of the search
+        cloud_cover (float): maximum cloud cover of the items, between 0 and 1
+    """
+
+    bounds = get_outer_bounds(bounds, param.PLANET_SEARCH_PRECISION)
+
+    return [bounds, start.isoformat(), end.isoformat(), cloud_cover]
+
+
+def get_planet_items(planet_model, bounds, start, end, cloud_cover):
+    """Search the Planet items of an area and a date range, from the cache when
+    the same search was already done, see get_planet_key.
+
+    Args:
+        planet_model (PlanetModel): authenticated Planet model
+        bounds (tuple): (west, south, east, north) bounds of the search
+        start (datetime.datetime): first date of the search
+        end (datetime.datetime): last date of the search
+        cloud_cover (float): maximum cloud cover of the items, between 0 and 1
+
+    Returns:
+        list: the Planet items, as dicts
+    """
+
+    key = get_planet_key(bounds, start, end, cloud_cover)
+    items = PLANET_CACHE.get(key, param.PLANET_CACHE_TTL)
+
+    if items is not None:
+        return items
+
+    with SEARCH_LOCK:
+        # The same search may have been done while waiting for the lock
+        items = PLANET_CACHE.get(key, param.PLANET_CACHE_TTL)
+
+        if items is None:
+            aoi = json.loads(shapely.to_geojson(box(*key[0])))
+            items = list(planet_model.get_items(aoi, start, end, cloud_cover))
+            PLANET_CACHE.set(key, items)
+
+    return items
+
+
+class PlanetPrefetcher:
+    """Run the Planet searches of the alerts that are likely to be displayed next
+    in a background thread, so their items are in the cache when needed.
+
+    The searches share the Planet session of the model, so they are run one at a
+    time, see SEARCH_LOCK. Only the searches of the last prefetch are kept, the
+    pending ones of the previous prefetches are cancelled.
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.futures = {}
+        self.lock = threading.Lock()
+
+    def prefetch(self, planet_model, searches):
+        """Search the Planet items of the given searches in the background
+
+        Args:
+            planet_model (PlanetModel): authenticated Planet model
+            searches (list): parameters of the searches, by priority, see
+                get_planet_items
+        """
+
+        searches = {json.dumps(get_planet_key(*search)): search for search in searches}
+
+        with self.lock:
+            for id_, future in list(self.futures.items()):
+                # Running searches can't be stopped, they still fill the cache
+                if future.done() or (id_ not in searches and future.cancel()):
+                    del self.futures[id_]
+
+            for id_, search in searches.items():
+                if id_ not in self.futures:
+                    self.futures[id_] = self.executor.submit(
+                        get_planet_items, planet_model, *search
+                    )
+
+    def get_items(self, planet_model, *search):
+        """Get the items of a search, waiting for its prefetch if it's running
+        instead of sending the same search again
+
+        Args:
+            planet_model (PlanetModel): authenticated Planet model
+            search: parameters of the search, see get_planet_items
+        """
+
+        with self.lock:
+            future = self.futures.get(json.dumps(get_planet_key(*search)))
+
+        if future is not None and not future.cancelled():
+            try:
+                return future.result()
+            except Exception:
+                # Search again to report the error to the user
+                pass
+
+        return get_planet_items(planet_model, *search)
+
+
+PLANET_PREFETCHER = PlanetPrefetcher()
+"PlanetPrefetcher: background searches of the next alerts"
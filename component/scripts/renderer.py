@@ -0,0 +1,254 @@
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import component.parameter as param
+from component.scripts.aggregation import get_mercator
+
+__all__ = ["AlertsRenderer", "encode_png"]
+
+EARTH_CIRCUMFERENCE = 40075016.686
+"float: length of the equator in meters, in Web Mercator"
+
+TILE_SIZE = 256
+"int: size of the XYZ tiles in pixels"
+
+MAX_DOT_SIZE = 3
+"int: maximum half size (in pixels) of the alerts drawn as plain dots"
+
+
+def encode_png(rgba):
+    """Encode a (height, width, 4) uint8 RGBA array as a PNG image"""
+
+    height, width, _ = rgba.shape
+
+    # Each scanline starts with its filter type (0: None)
+    raw = np.zeros((height, width * 4 + 1), dtype="uint8")
+    raw[:, 1:] = rgba.reshape(height, -1)
+
+    def chunk(tag, data):
+        crc = zlib.crc32(tag + data) & 0xFFFFFFFF
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", crc)
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 6, 0, 0, 0)
+
+    return b"".join(
+        [
+            b"\x89PNG\r\n\x1a\n",
+            chunk(b"IHDR", header),
+            chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)),
+            chunk(b"IEND", b""),
+        ]
+    )
+
+
+EMPTY_TILE = encode_png(np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype="uint8"))
+"bytes: transparent tile returned where there are no alerts"
+
+
+def spread_bits(v):
+    """Insert a 0 bit between each of the 16 lower bits of the integers"""
+
+    v = np.asarray(v, dtype="uint64")
+    v = (v | (v << np.uint64(8))) & np.uint64(0x00FF00FF)
+    v = (v | (v << np.uint64(4))) & np.uint64(0x0F0F0F0F)
+    v = (v | (v << np.uint64(2))) & np.uint64(0x33333333)
+    v = (v | (v << np.uint64(1))) & np.uint64(0x55555555)
+
+    return v
+
+
+def get_morton_codes(x, y):
+    """Interleave the bits of the tile columns and rows (z-order curve), so each
+    tile of a lower zoom level is a contiguous range of codes"""
+
+    return spread_bits(x) | (spread_bits(y) << np.uint64(1))
+
+
+class AlertsRenderer:
+    """Render the alerts as XYZ raster tiles, colored by confidence.
+
+    The alerts are sorted along a z-order curve of the Web Mercator tiles of
+    level TILE_MAX_LEVEL, the alerts of any tile are then found with a binary
+    search. Rendered tiles are kept in a LRU cache.
+
+    Args:
+        lon (np.ndarray): longitudes of the alerts
+        lat (np.ndarray): latitudes of the alerts
+        colors (np.ndarray): color name of each alert, see param.TILE_COLORS
+        sizes (np.ndarray): footprint size of each alert in meters
+        cache_size (int): number of rendered tiles kept in memory
+    """
+
+    def __init__(self, lon, lat, colors, sizes, cache_size=param.TILE_CACHE_SIZE):
+
+        self.level = param.TILE_MAX_LEVEL
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+
+        x, y = get_mercator(lon, lat)
+
+        n = 2**self.level
+        col = np.clip((x * n).astype("int64"), 0, n - 1)
+        row = np.clip((y * n).astype("int64"), 0, n - 1)
+
+        self.codes = get_morton_codes(col, row)
+        order = np.argsort(self.codes, kind="stable")
+        self.codes = self.codes[order]
+
+        self.x = x[order]
+        self.y = y[order]
+        self.cos_lat = np.cos(np.radians(np.asarray(lat, dtype="float64")[order]))
+        self.half_size = np.asarray(sizes, dtype="float64")[order] / 2
+
+        codes, names = pd.factorize(np.asarray(colors)[order])
+        self.palette = np.array(
+            [[*param.TILE_COLORS[name], 255] for name in names], dtype="uint8"
+        ).reshape(-1, 4)
+        self.color_ids = codes
+
+    def get_tile(self, z, x, y):
+        """Get the PNG image of a tile, from the cache when it's available"""
+
+        key = (z, x, y)
+
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                return self.cache[key]
+
+        tile = self.render(z, x, y)
+
+        with self.lock:
+            self.cache[key] = tile
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+        return tile
+
+    def query(self, level, col, row):
+        """Get the positions of the alerts in a tile of a level lower or equal to
+        TILE_MAX_LEVEL and in its 8 neighbours"""
+
+        n = 2**level
+        shift = np.uint64(2 * (self.level - level))
+
+        ranges = []
+        for c in range(max(col - 1, 0), min(col + 2, n)):
+            for r in range(max(row - 1, 0), min(row + 2, n)):
+                prefix = get_morton_codes(c, r)
+                lo = prefix << shift
+                hi = (prefix + np.uint64(1)) << shift
+                start, end = np.searchsorted(self.codes, [lo, hi])
+                ranges.append(np.arange(start, end))
+
+        # Tiles requested outside of the grid have no neighbours
+        if not ranges:
+            return np.array([], dtype="int64")
+
+        return np.concatenate(ranges)
+
+    def render(self, z, x, y):
+        """Draw the alerts of a tile as squares of their footprint size, or as
+        small dots when they are smaller than a few pixels"""
+
+        level = min(z, self.level)
+        shift = z - level
+        idx = self.query(level, x >> shift, y >> shift)
+
+        if not len(idx):
+            return EMPTY_TILE
+
+        scale = 2**z
+        px = np.floor((self.x[idx] * scale - x) * TILE_SIZE).astype("int64")
+        py = np.floor((self.y[idx] * scale - y) * TILE_SIZE).astype("int64")
+
+        resolution = EARTH_CIRCUMFERENCE * self.cos_lat[idx] / (TILE_SIZE * scale)
+        half = np.maximum(1, np.ceil(self.half_size[idx] / resolution)).astype("int64")
+
+        visible = (
+            (px + half >= 0)
+            & (px - half < TILE_SIZE)
+            & (py + half >= 0)
+            & (py - half < TILE_SIZE)
+        )
+
+        if not visible.any():
+            return EMPTY_TILE
+
+        idx, px, py, half = idx[visible], px[visible], py[visible], half[visible]
+        dots = half.max() <= MAX_DOT_SIZE
+
+        # At low zoom levels most of the alerts share their pixel with others,
+        # only keep the last one of each pixel as it would hide the others
+        if dots:
+            width = TILE_SIZE + 2 * MAX_DOT_SIZE
+            pixels = (py + MAX_DOT_SIZE) * width + px + MAX_DOT_SIZE
+
+            canvas = np.full(width * width, -1, dtype="int64")
+            canvas[pixels] = np.arange(len(pixels))
+            last = canvas[canvas >= 0]
+
+            idx, px, py, half = idx[last], px[last], py[last], half[last]
+
+        rgba = self.palette[self.color_ids[idx]]
+        image = np.zeros((TILE_SIZE, TILE_SIZE, 4), dtype="uint8")
+
+        if dots:
+            self.draw_dots(image, px, py, half, rgba)
+        else:
+            self.draw_squares(image, px, py, half, rgba)
+
+        return encode_png(image)
+
+    @staticmethod
+    def draw_dots(image, px, py, half, rgba):
+        """Fill small squares, one offset at a time for all the alerts"""
+
+        size = int(half.max())
+
+        for dx in range(-size, size + 1):
+            for dy in range(-size, size + 1):
+                cx, cy = px + dx, py + dy
+                mask = (
+                    (abs(dx) <= half)
+                    & (abs(dy) <= half)
+                    & (cx >= 0)
+                    & (cx < TILE_SIZE)
+                    & (cy >= 0)
+                    & (cy < TILE_SIZE)
+                )
+                image[cy[mask], cx[mask]] = rgba[mask]
+
+    @staticmethod
+    def draw_squares(image, px, py, half, rgba):
+        """Draw large squares with a light fill and an opaque border, like the
+        vector layer"""
+
+        fill = rgba.copy()
+        fill[:, 3] = 40
+
+        x0 = np.clip(px - half, 0, TILE_SIZE)
+        x1 = np.clip(px + half + 1, 0, TILE_SIZE)
+        y0 = np.clip(py - half, 0, TILE_SIZE)
+        y1 = np.clip(py + half + 1, 0, TILE_SIZE)
+
+        for i in range(len(px)):
+            image[y0[i] : y1[i], x0[i] : x1[i]] = fill[i]
+
+        for i in range(len(px)):
+            left, right = px[i] - half[i], px[i] + half[i]
+            top, bottom = py[i] - half[i], py[i] + half[i]
+
+            for col in (left, left + 1, right - 1, right):
+                if 0 <= col < TILE_SIZE:
+                    image[y0[i] : y1[i], col] = rgba[i]
+
+            for row in (top, top + 1, bottom - 1, bottom):
+                if 0 <= row < TILE_SIZE:
+                    image[row, x0[i] : x1[i]] = rgba[i]
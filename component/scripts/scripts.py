@@ -1,23 +1,24 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
 import requests
 
 import component.parameter as param
 
 __all__ = [
-    "get_thresholds",
     "get_confidence_color",
+    "get_confidence_classes",
+    "get_payload_size",
     "parse_offset",
+    "get_end_date",
+    "get_windows",
+    "get_dates",
+    "get_gap_windows",
 ]
 
 
-def get_thresholds(lower):
-    """Get the upper limit based on the lower value"""
-
-    thres = sorted(param.CONFIDENCE["disc"].keys(), reverse=True)
-    upper = 100 if thres.index(lower) == 0 else thres[thres.index(lower) - 1]
-
-    return (upper, lower)
-
-
 def parse_offset(offset):
     """it will return a parsed integer from text offsets available in
     offset_days widget items.
@@ -31,6 +32,93 @@ def parse_offset(offset):
     return number if number < 11 else int(number / 24)
 
 
+def get_end_date(start_date, offset):
+    """Get the last date (YYYY-MM-DD) covered by a query of offset days starting on
+    start_date
+
+    Args:
+        start_date (str): initial date in YYYY-MM-DD format
+        offset (str): offset days, as available in offset_days widget items.
+    """
+
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = start + timedelta(days=parse_offset(offset) - 1)
+
+    return end.strftime("%Y-%m-%d")
+
+
+def get_windows(start_date, end_date, max_days=param.MAX_DAY_RANGE):
+    """Split a date range into the consecutive windows accepted by the FIRMS API
+
+    Example:
+        get_windows("2023-08-01", "2023-08-25")
+        [("2023-08-01", 10), ("2023-08-11", 10), ("2023-08-21", 5)]
+
+    Args:
+        start_date (str): first date of the range in YYYY-MM-DD format
+        end_date (str): last date (included) of the range in YYYY-MM-DD format
+        max_days (int): maximum number of days of each window
+
+    Returns:
+        list of tuples: (start date, number of days) of each window
+    """
+
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+
+    windows = []
+    while start <= end:
+        days = min(max_days, (end - start).days + 1)
+        windows.append((start.strftime("%Y-%m-%d"), days))
+        start += timedelta(days=days)
+
+    return windows
+
+
+def get_dates(windows):
+    """Get all the dates (YYYY-MM-DD) covered by (start date, days) windows. Windows
+    without start date are the near real time ones, ending today (UTC)."""
+
+    today = datetime.now(timezone.utc).replace(tzinfo=None)
+    today = today.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    dates = []
+    for start_date, days in windows:
+        if start_date:
+            start = datetime.strptime(start_date, "%Y-%m-%d")
+        else:
+            start = today - timedelta(days=days - 1)
+
+        dates += [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days)]
+
+    return dates
+
+
+def get_gap_windows(dates):
+    """Group sorted dates (YYYY-MM-DD) into the fewest windows accepted by the FIRMS
+    API
+
+    Example:
+        get_gap_windows(["2023-08-01", "2023-08-02", "2023-08-05"])
+        [("2023-08-01", 2), ("2023-08-05", 1)]
+    """
+
+    windows = []
+    run = []
+    for day in dates:
+        if run and datetime.strptime(day, "%Y-%m-%d") - datetime.strptime(
+            run[-1], "%Y-%m-%d"
+        ) != timedelta(days=1):
+            windows += get_windows(run[0], run[-1])
+            run = []
+        run.append(day)
+
+    if run:
+        windows += get_windows(run[0], run[-1])
+
+    return windows
+
+
 def get_confidence_color(satsource, value):
     """Return confidence color depending on the satellite type
 
@@ -59,3 +147,63 @@ def get_confidence_color(satsource, value):
 
     else:
         return confidence_color[value]
+
+
+def get_confidence_classes(satsources, confidences):
+    """Map the discrete (MODIS) and categorical (VIIRS) confidences of the alerts
+    to the common low, nominal and high classes, see param.CONFIDENCE_CLASSES
+
+    Args:
+        satsources (str, array-like): satellite source of all the alerts or of
+            each alert
+        confidences (array-like): confidence of each alert
+
+    Returns:
+        pd.Categorical: ordered confidence class of each alert
+    """
+
+    # Only map each distinct (satellite source, confidence) pair once
+    conf_codes, conf_uniques = pd.factorize(pd.Series(confidences))
+
+    if isinstance(satsources, str):
+        sat_codes, sat_uniques = np.zeros(len(conf_codes), dtype="int64"), [satsources]
+    else:
+        sat_codes, sat_uniques = pd.factorize(pd.Series(satsources))
+
+    # Discrete values: the lowest category also holds the values below its limit
+    bounds = sorted(param.CONFIDENCE["disc"])[1:]
+
+    # Categorical values, full names or abbreviations
+    categories = {
+        value: param.CONFIDENCE_CLASSES.index(name)
+        for value, (name, _) in param.CONFIDENCE["cat"].items()
+    }
+
+    # Fused alerts share the confidence column, other sensors' values don't
+    # match any class
+    values = pd.to_numeric(pd.Series(conf_uniques), errors="coerce").to_numpy()
+    discrete = np.where(
+        np.isnan(values), -1, np.searchsorted(bounds, values, side="right")
+    )
+    categorical = [categories.get(str(value), -1) for value in conf_uniques]
+
+    table = np.array(
+        [
+            discrete if str(satsource).startswith("modis") else categorical
+            for satsource in sat_uniques
+        ],
+        dtype="int8",
+    ).reshape(len(sat_uniques), len(conf_uniques))
+
+    codes = table[sat_codes, conf_codes]
+
+    return pd.Categorical.from_codes(
+        codes, categories=param.CONFIDENCE_CLASSES, ordered=True
+    )
+
+
+def get_payload_size(data):
+    """Get the size in bytes of a json serializable object once serialized, to
+    measure the data sent to the browser"""
+
+    return len(json.dumps(data, separators=(",", ":")).encode())
@@ -0,0 +1,445 @@
+import numpy as np
+import pandas as pd
+import shapely
+
+import component.parameter as param
+from component.scripts.aggregation import get_mercator
+
+__all__ = [
+    "clip_points",
+    "assign_features",
+    "split_antimeridian",
+    "get_squares",
+    "GridIndex",
+    "get_close_pairs",
+    "get_hilbert_order",
+    "get_nearest_order",
+]
+
+
+def clip_points(lon, lat, geometry):
+    """Get the positions of the points intersecting a geometry.
+
+    Points are first filtered with the geometry bounding box on the raw
+    coordinates, and only the remaining ones are tested against the prepared
+    geometry, without building any point geometry.
+
+    Args:
+        lon (np.ndarray): longitudes of the points
+        lat (np.ndarray): latitudes of the points
+        geometry (shapely.Geometry): clipping geometry in EPSG:4326
+
+    Returns:
+        np.ndarray: positions of the points intersecting the geometry
+    """
+
+    west, south, east, north = geometry.bounds
+
+    candidates = np.flatnonzero(
+        (lon >= west) & (lon <= east) & (lat >= south) & (lat <= north)
+    )
+
+    shapely.prepare(geometry)
+    inside = shapely.intersects_xy(
+        geometry, lon[candidates].astype("float64"), lat[candidates].astype("float64")
+    )
+
+    return candidates[inside]
+
+
+def assign_features(lon, lat, geometries):
+    """Find the features containing each point in a single pass over the points.
+
+    Points outside of the features total bounds are discarded on the raw
+    coordinates, the others are matched with the features through a STRtree.
+
+    Args:
+        lon (np.ndarray): longitudes of the points
+        lat (np.ndarray): latitudes of the points
+        geometries (array of shapely.Geometry): features geometries in EPSG:4326
+
+    Returns:
+        tuple of np.ndarray: positions of the points and index of their feature for
+            each (point, feature) intersecting pair, sorted by point position and
+            feature index
+    """
+
+    west, south, east, north = shapely.total_bounds(geometries)
+
+    candidates = np.flatnonzero(
+        (lon >= west) & (lon <= east) & (lat >= south) & (lat <= north)
+    )
+
+    points = shapely.points(
+        lon[candidates].astype("float64"), lat[candidates].astype("float64")
+    )
+
+    tree = shapely.STRtree(geometries)
+    point_idx, feature_idx = tree.query(points, predicate="intersects")
+
+    order = np.lexsort((feature_idx, point_idx))
+
+    return candidates[point_idx[order]], feature_idx[order]
+
+
+def split_antimeridian(geometry):
+    """Split a geometry crossing the antimeridian and wrap its parts lying beyond
+    +/-180 degrees back into the [-180, 180] longitude range.
+
+    Shapes drawn across the antimeridian on the map have longitudes beyond 180
+    (or below -180) while the alerts longitudes never do.
+
+    Args:
+        geometry (shapely.Geometry): geometry in EPSG:4326
+
+    Returns:
+        shapely.Geometry: the wrapped geometry, the geometry itself if it doesn't
+            cross the antimeridian
+    """
+
+    west, _, east, _ = geometry.bounds
+
+    if west >= -180 and east <= 180:
+        return geometry
+
+    parts = [shapely.clip_by_rect(geometry, -180, -90, 180, 90)]
+
+    if east > 180:
+        part = shapely.clip_by_rect(geometry, 180, -90, 540, 90)
+        parts.append(shapely.transform(part, lambda coords: coords - [360, 0]))
+
+    if west < -180:
+        part = shapely.clip_by_rect(geometry, -540, -90, -180, 90)
+        parts.append(shapely.transform(part, lambda coords: coords + [360, 0]))
+
+    return shapely.union_all([part for part in parts if not part.is_empty])
+
+
+def get_squares(lon, lat, half_size):
+    """Compute the corners of the ground squares centered on each point in a single
+    batch, using a local equirectangular approximation of the earth surface.
+
+    Args:
+        lon (np.ndarray): longitudes of the points
+        lat (np.ndarray): latitudes of the points
+        half_size (float, np.ndarray): half of the side of the squares in meters,
+            either a single value or one value per point
+
+    Returns:
+        np.ndarray: (n, 5, 2) closed rings of (lon, lat) coordinates
+    """
+
+    lon = np.asarray(lon, dtype="float64")
+    lat = np.asarray(lat, dtype="float64")
+
+    dlat = np.broadcast_to(half_size / param.METERS_PER_DEGREE, lat.shape)
+    dlon = dlat / np.cos(np.radians(lat))
+
+    xs = lon[:, None] + dlon[:, None] * np.array([-1, 1, 1, -1, -1])
+    ys = lat[:, None] + dlat[:, None] * np.array([-1, -1, 1, 1, -1])
+
+    return np.stack([xs, ys], axis=-1)
+
+
+class GridIndex:
+    """Regular grid index of points, to find the points inside a bounding box
+    without testing all of them.
+
+    The points are sorted by cell, row by row, so the points of consecutive
+    cells of a row are contiguous and each row of the box is found with a
+    binary search.
+
+    Args:
+        lon (np.ndarray): longitudes of the points
+        lat (np.ndarray): latitudes of the points
+        cell_size (float): size of the grid cells in degrees
+    """
+
+    def __init__(self, lon, lat, cell_size=param.WINDOW_CELL):
+        self.cell_size = cell_size
+        self.ncols = int(np.ceil(360 / cell_size)) + 1
+        self.nrows = int(np.ceil(180 / cell_size)) + 1
+
+        self.lon = np.asarray(lon, dtype="float64")
+        self.lat = np.asarray(lat, dtype="float64")
+
+        keys = self.get_row(self.lat) * self.ncols + self.get_col(self.lon)
+        self.order = np.argsort(keys, kind="stable")
+        self.keys = keys[self.order]
+
+    def get_col(self, lon):
+        """Get the grid column of longitudes"""
+
+        col = np.floor((np.asarray(lon) + 180) / self.cell_size)
+
+        return np.clip(col, 0, self.ncols - 1).astype("int64")
+
+    def get_row(self, lat):
+        """Get the grid row of latitudes"""
+
+        row = np.floor((np.asarray(lat) + 90) / self.cell_size)
+
+        return np.clip(row, 0, self.nrows - 1).astype("int64")
+
+    def query(self, west, south, east, north):
+        """Get the positions of the points inside the bounds, sorted.
+
+        Map views crossing the antimeridian have longitudes beyond +/-180 degrees
+        (or a west bound greater than the east one), their box is split at the
+        antimeridian and its parts are wrapped back into [-180, 180], like
+        split_antimeridian.
+
+        Args:
+            west, south, east, north (float): bounds of the box in degrees
+
+        Returns:
+            np.ndarray: positions of the points
+        """
+
+        if east < west:
+            east += 360
+
+        if east - west >= 360:
+            return self._query(-180, south, 180, north)
+
+        # Move the west bound into [-180, 180)
+        shift = np.floor((west + 180) / 360) * 360
+        west, east = west - shift, east - shift
+
+        if east <= 180:
+            return self._query(west, south, east, north)
+
+        return np.union1d(
+            self._query(west, south, 180, north),
+            self._query(-180, south, east - 360, north),
+        )
+
+    def _query(self, west, south, east, north):
+        """Get the positions of the points inside bounds within [-180, 180]"""
+
+        col_min, col_max = int(self.get_col(west)), int(self.get_col(east))
+        rows = np.arange(int(self.get_row(south)), int(self.get_row(north)) + 1)
+
+        starts = np.searchsorted(self.keys, rows * self.ncols + col_min)
+        ends = np.searchsorted(self.keys, rows * self.ncols + col_max, side="right")
+
+        candidates = self.order[
+            np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+        ]
+
+        # The cells on the edges of the box are only partly inside
+        lon, lat = self.lon[candidates], self.lat[candidates]
+        inside = (lon >= west) & (lon <= east) & (lat >= south) & (lat <= north)
+
+        return np.sort(candidates[inside])
+
+
+def get_close_pairs(lat, lon, minutes, distance, max_time):
+    """Get the pairs of points closer than a distance and a time tolerance.
+
+    Candidate pairs are found with a hash join on a grid of cells as large as
+    the distance, comparing each point only with the ones of its neighbouring
+    cells instead of all the others.
+
+    Args:
+        lat (np.ndarray): latitudes of the points
+        lon (np.ndarray): longitudes of the points
+        minutes (np.ndarray): times of the points in minutes
+        distance (float): maximum distance in meters between the points
+        max_time (float): maximum time in minutes between the points
+
+    Returns:
+        (np.ndarray, np.ndarray): positions of the 2 points of each pair, every
+            pair is returned once
+    """
+
+    if len(lat) == 0:
+        return np.array([], dtype="int64"), np.array([], dtype="int64")
+
+    # Use the narrowest longitude degree of the data so the cells are never
+    # smaller than the distance
+    max_lat = np.radians(min(np.abs(lat).max(), 85))
+    cell_lat = distance / param.METERS_PER_DEGREE
+    cell_lon = cell_lat / np.cos(max_lat)
+
+    cells = pd.DataFrame(
+        {
+            "x": np.floor(lon / cell_lon).astype("int64"),
+            "y": np.floor(lat / cell_lat).astype("int64"),
+            "pos": np.arange(len(lat)),
+        }
+    )
+
+    # Pairs are symmetric, only look at half of the neighbouring cells
+    sources, targets = [], []
+    for dx, dy in [(0, 0), (1, -1), (1, 0), (1, 1), (0, 1)]:
+        shifted = cells.assign(x=cells.x + dx, y=cells.y + dy)
+        pairs = cells.merge(shifted, on=["x", "y"], suffixes=("", "_other"))
+
+        i = pairs.pos.to_numpy()
+        j = pairs.pos_other.to_numpy()
+
+        # Equirectangular distance is accurate enough at the pixel scale
+        dy_m = (lat[i] - lat[j]) * param.METERS_PER_DEGREE
+        dx_m = (lon[i] - lon[j]) * param.METERS_PER_DEGREE * np.cos(np.radians(lat[i]))
+
+        close = (np.abs(minutes[i] - minutes[j]) <= max_time) & (
+            dx_m**2 + dy_m**2 <= distance**2
+        )
+
+        # Points of the same cell are joined with themselves and in both orders
+        if (dx, dy) == (0, 0):
+            close &= i < j
+
+        sources.append(i[close])
+        targets.append(j[close])
+
+    return np.concatenate(sources), np.concatenate(targets)
+
+
+def get_hilbert_order(lon, lat, level=16):
+    """Sort the points along a Hilbert curve of their Web Mercator coordinates,
+    so consecutive points are close to each other.
+
+    Args:
+        lon (np.ndarray): longitudes of the points
+        lat (np.ndarray): latitudes of the points
+        level (int): the curve fills a 2**level x 2**level grid
+
+    Returns:
+        np.ndarray: positions of the points in the traversal order
+    """
+
+    n = 2**level
+    x, y = get_mercator(lon, lat)
+    x = np.clip((x * n).astype("int64"), 0, n - 1)
+    y = np.clip((y * n).astype("int64"), 0, n - 1)
+
+    codes = np.zeros(len(x), dtype="int64")
+
+    s = n // 2
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        codes += s * s * ((3 * rx) ^ ry)
+
+        # Rotate the quadrant so the curve stays continuous
+        flip = ~ry & rx
+        x = np.where(flip, n - 1 - x, x)
+        y = np.where(flip, n - 1 - y, y)
+        x, y = np.where(~ry, y, x), np.where(~ry, x, y)
+
+        s //= 2
+
+    return np.argsort(codes, kind="stable")
+
+
+def get_nearest_order(lon, lat, occupancy=4):
+    """Build a tour of the points going each time to the closest point not
+    visited yet (greedy nearest neighbour), starting from the first one.
+
+    The unvisited points are kept in a grid and the closest one is searched in
+    growing rings of cells around the current point. Fires are clustered, so
+    the cells are sized from the occupied cells rather than from the extent of
+    the points. When scanning the rings would cost more than comparing all the
+    unvisited points, e.g. to jump to the next cluster, they are all compared.
+
+    Args:
+        lon (np.ndarray): longitudes of the points
+        lat (np.ndarray): latitudes of the points
+        occupancy (int): maximum average number of points in the cell of a
+            point
+
+    Returns:
+        np.ndarray: positions of the points in the traversal order
+    """
+
+    n = len(lon)
+    if n == 0:
+        return np.array([], dtype="int64")
+
+    # Local equirectangular coordinates
+    lat = np.asarray(lat, dtype="float64")
+    x = np.asarray(lon, dtype="float64") * np.cos(np.radians(lat.mean()))
+    y = lat
+
+    x = x - x.min()
+    y = y - y.min()
+
+    # Start from cells of 2 points on average if they were spread uniformly,
+    # and split them until the points don't share their cell with too many
+    # others (stops with duplicated points)
+    cell = np.sqrt(max(np.ptp(x) * np.ptp(y), 1e-12) * 2 / n)
+    for _ in range(16):
+        cols = (x // cell).astype("int64")
+        rows = (y // cell).astype("int64")
+        _, counts = np.unique(cols * (rows.max() + 1) + rows, return_counts=True)
+
+        if (counts**2).sum() / n <= occupancy:
+            break
+        cell /= 2
+
+    cells = {}
+    for pos, key in enumerate(zip(cols.tolist(), rows.tolist())):
+        cells.setdefault(key, []).append(pos)
+
+    unvisited = np.ones(n, dtype="bool")
+    order = np.empty(n, dtype="int64")
+
+    current = 0
+    for i in range(n):
+        order[i] = current
+        unvisited[current] = False
+        cells[cols[current], rows[current]].remove(current)
+
+        if i == n - 1:
+            break
+
+        col, row = cols[current], rows[current]
+        cx, cy = x[current], y[current]
+        best, best_dist = None, np.inf
+
+        ring, scanned = 0, 0
+        while True:
+            for key in get_ring(col, row, ring):
+                for pos in cells.get(key, ()):
+                    dist = (x[pos] - cx) ** 2 + (y[pos] - cy) ** 2
+                    if dist < best_dist:
+                        best, best_dist = pos, dist
+
+            # Points out of the scanned rings are further than ring * cell
+            if best is not None and best_dist <= (ring * cell) ** 2:
+                break
+
+            # Comparing all the points at once is much faster per point than
+            # scanning the cells one by one
+            scanned += max(8 * ring, 1)
+            if scanned * 32 > n - i:
+                candidates = np.flatnonzero(unvisited)
+                dist = (x[candidates] - cx) ** 2 + (y[candidates] - cy) ** 2
+                best = candidates[np.argmin(dist)]
+                break
+
+            ring += 1
+
+        current = best
+
+    return order
+
+
+def get_ring(col, row, ring):
+    """Get the (col, row) keys of the cells on the border of the square of
+    2 * ring + 1 cells centered on a cell"""
+
+    if ring == 0:
+        return [(col, row)]
+
+    top, bottom = row - ring, row + ring
+    left, right = col - ring, col + ring
+
+    return (
+        [(c, top) for c in range(left, right + 1)]
+        + [(c, bottom) for c in range(left, right + 1)]
+        + [(left, r) for r in range(top + 1, bottom)]
+        + [(right, r) for r in range(top + 1, bottom)]
+    )
@@ -0,0 +1,118 @@
+import os
+import re
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import component.parameter as param
+
+__all__ = ["TileServer"]
+
+
+class TileHandler(BaseHTTPRequestHandler):
+    """Serve the /{layer id}/{z}/{x}/{y}.png tiles of the registered renderers"""
+
+    PATH = re.compile(r"^/(\w+)/(\d+)/(\d+)/(\d+)\.png$")
+
+    def do_GET(self):
+
+        match = self.PATH.match(self.path.split("?")[0])
+        renderer = match and self.server.renderers.get(match.group(1))
+
+        if not renderer:
+            self.send_error(404)
+            return
+
+        z, x, y = (int(group) for group in match.groups()[1:])
+        tile = renderer.get_tile(z, x, y)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "image/png")
+        self.send_header("Content-Length", str(len(tile)))
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.send_header("Cache-Control", "max-age=3600")
+        self.end_headers()
+        self.wfile.write(tile)
+
+    def log_message(self, format, *args):
+        """Don't write each request in the notebook output"""
+
+
+class TileServer:
+    """Local http server of the tiles rendered in the kernel. It's only started
+    when the first renderer is added.
+
+    The browser reaches it through the Jupyter server proxy, as the kernel port
+    is not exposed when the notebook is hosted. The proxy has to be installed in
+    the environment of the Jupyter server, which the kernel can't check: it's
+    part of the module requirements and can be disabled with the
+    ALERTS_TILES_PROXY=false environment variable when it's missing.
+
+    Args:
+        host (str): interface to listen on
+        base_url (str, optional): base url of the Jupyter server. Defaults to the
+            JupyterHub prefix of the user server, or "/".
+        proxy (bool, optional): whether the Jupyter server proxy is available.
+            Defaults to the ALERTS_TILES_PROXY environment variable, or True.
+    """
+
+    def __init__(self, host="127.0.0.1", base_url=None, proxy=None):
+        self.host = host
+        self.base_url = base_url or os.environ.get("JUPYTERHUB_SERVICE_PREFIX", "/")
+
+        if proxy is None:
+            proxy = os.environ.get("ALERTS_TILES_PROXY", "true").lower() != "false"
+
+        self.proxy = proxy
+        self.server = None
+        self.renderers = {}
+        self.lock = threading.Lock()
+
+    def is_available(self):
+        """Check if the tiles can be reached from the browser, i.e. if the
+        Jupyter server proxy is available"""
+
+        return self.proxy
+
+    def start(self):
+        """Start the server on a free port, in a daemon thread"""
+
+        with self.lock:
+            if self.server is None:
+                self.server = ThreadingHTTPServer((self.host, 0), TileHandler)
+                self.server.daemon_threads = True
+                self.server.renderers = self.renderers
+
+                thread = threading.Thread(target=self.server.serve_forever)
+                thread.daemon = True
+                thread.start()
+
+    def add(self, renderer):
+        """Serve the tiles of a renderer
+
+        Args:
+            renderer (AlertsRenderer): renderer of the tiles
+
+        Returns:
+            tuple: id of the layer and XYZ url template of its tiles
+        """
+
+        self.start()
+
+        layer_id = uuid.uuid4().hex
+        self.renderers[layer_id] = renderer
+
+        port = self.server.server_address[1]
+
+        base_url = self.base_url.rstrip("/") + "/"
+
+        return layer_id, param.ALERTS_TILES_URL.format(base_url, port, layer_id)
+
+    def remove(self, layer_id):
+        """Stop serving the tiles of a layer"""
+
+        self.renderers.pop(layer_id, None)
+
+
+TILE_SERVER = TileServer()
+"TileServer: server of the alerts tiles"
@@ -1,23 +1,19 @@
-import datetime
 import os
 
 import ipyvuetify as v
+import numpy as np
 import pandas as pd
-import pytz
 import sepal_ui.sepalwidgets as sw
-from ipyleaflet import GeoJSON
-from numpy import float64
 from sepal_ui import color
 from sepal_ui.scripts import utils as su
-from sepal_ui.scripts.decorator import loading_button, switch
-from sepal_ui.scripts.warning import SepalWarning
+from sepal_ui.scripts.decorator import loading_button
 from traitlets import link
 
 import component.parameter as param
-import component.scripts as scripts
 import component.scripts.firms_requests as firms
 import component.widget as cw
 from component.message import cm
+from component.scripts.tile_server import TILE_SERVER
 
 __all__ = ["AlertsTile"]
 
@@ -171,11 +167,25 @@ class AlertsView(sw.ExpansionPanel):
             disabled=True,
             small=True,
         )
-        buttons = v.Flex(children=[self.btn, self.download_btn])
+        self.refresh_btn = sw.Btn(
+            cm.alerts.wlabel.refresh_btn,
+            "mdi-refresh",
+            class_="ma-2",
+            disabled=True,
+            small=True,
+        )
+        buttons = v.Flex(children=[self.btn, self.refresh_btn, self.download_btn])
 
         self.w_satellite = sw.Select(
             label=cm.alerts.wlabel.satellite, v_model="MODIS_NRT"
         )
+        self.w_sensors = sw.Select(
+            label=cm.alerts.wlabel.sensors,
+            multiple=True,
+            chips=True,
+            small_chips=True,
+            v_model=[],
+        )
         self.w_historic = WidgetHistoric(self.model).hide()
 
         self.get_sat_sources()
@@ -191,6 +201,7 @@ class AlertsView(sw.ExpansionPanel):
 
         self.model.bind(self.w_alerts_type, "alerts_type")
         self.model.bind(self.w_satellite, "satsource")
+        self.model.bind(self.w_sensors, "sensors")
         link((self.model, "offset_days"), (self.w_timespan, "v_model"))
 
         self.children = [
@@ -199,6 +210,7 @@ class AlertsView(sw.ExpansionPanel):
                 children=[
                     self.w_alerts_type,
                     self.w_satellite,
+                    self.w_sensors,
                     self.w_timespan,
                     self.w_historic,
                     buttons,
@@ -217,13 +229,18 @@ class AlertsView(sw.ExpansionPanel):
 
         # Interatcions with map widgets
         self.map_.w_alerts.observe(self.filter_confidence, "confidence")
+        self.map_.w_alerts.observe(self.sort_alerts, "order")
+        self.map_.w_alerts.observe(self.group_events, "by_event")
         self.map_.w_alerts.observe(self.alert_list_event, "v_model")
 
         self.btn.on_event("click", self.get_alerts)
+        self.refresh_btn.on_event("click", self.refresh_alerts)
         self.download_btn.on_event("click", self.write_alerts)
 
         # Every time a satellite has changed, we fill the min or max dates
         self.w_satellite.observe(self.w_historic.set_min_max_dates, "v_model")
+        self.w_sensors.observe(self.w_historic.set_min_max_dates, "v_model")
+        self.w_sensors.observe(self.toggle_satellite, "v_model")
 
     def get_sat_sources(self):
         """Get the corresponding items for the satellite source dropdown widget
@@ -236,6 +253,14 @@ class AlertsView(sw.ExpansionPanel):
 
         self.w_satellite.v_model = self.w_satellite.items[0]["value"]
 
+        self.w_sensors.items = self.w_satellite.items
+        self.w_sensors.v_model = []
+
+    def toggle_satellite(self, change):
+        """Disable the single satellite selection when several sources are fused"""
+
+        self.w_satellite.disabled = bool(change["new"])
+
     def write_alerts(self, *args):
         """Write AOI alerts into a shapefile on the module results"""
 
@@ -271,17 +296,30 @@ class AlertsView(sw.ExpansionPanel):
         self.model.reset = True
 
         self.download_btn.disabled = True
+        self.refresh_btn.disabled = True
 
         if not self.model.aoi_geometry:
             raise Exception(cm.ui.valid_aoi)
 
         if self.model.aoi_method == "draw":
-            self.map_.dc.clear()
-            self.map_.add_layer(GeoJSON(data=self.model.aoi_geometry))
+            self.map_.freeze_drawn_aoi()
 
-        self.alert.add_live_msg(cm.ui.downloading_alerts, type_="info")
+        tiles = self.model.get_request_tiles()
+        self.alert.add_live_msg(
+            cm.ui.request_plan.format(
+                len(tiles), round(self.model.get_area_saving(tiles) * 100)
+            ),
+            type_="info",
+        )
+
+        def report_window(window, done, total):
+            start_date, days = window
+            self.alert.add_live_msg(
+                cm.ui.downloading_window.format(days, start_date, done, total),
+                type_="info",
+            )
 
-        self.model.get_firms_alerts()
+        self.model.get_firms_alerts(callback=report_window)
 
         # Clip alerts_gdf to the selected aoi
         self.alert.add_msg(msg=cm.ui.clipping, type_="info")
@@ -291,77 +329,155 @@ class AlertsView(sw.ExpansionPanel):
         # Reformat geodataframe
         self.model.format_gdf()
 
-        # If there are more alerts thatn the threhsold, avoid display them
-        # into the map
-
-        if len(self.model.aoi_alerts) <= param.MAX_ALERTS:
-            # Update map dropdown alerts
-            self.map_.w_alerts.items = list(self.model.aoi_alerts.index)
-            self.map_.w_alerts.w_conf.items = self.model.get_confidence_items()
+        # Update map dropdown alerts
+        self.map_.w_alerts.set_ids(self.model.get_confidence_ids("All"))
+        self.map_.w_alerts.w_conf.items = self.model.get_confidence_items()
 
-            # Convert aoi alert points into squares
-            square_alerts = self.model.alerts_to_squares()
+        # Alerts are aggregated at low zoom levels
+        self.model.compute_aggregates()
+        self.map_.reset_aggregates()
 
-            # Create an event for the alerts
-            def geojson_callback(**kwargs):
-                self.map_.w_alerts.v_model = int(kwargs["id"])
+        self.add_alerts_layer(self.model.aoi_alerts)
 
-            square_alerts.on_click(geojson_callback)
+        self.map_.w_alerts.disabled = False
+        self.map_.w_alerts.show()
 
-            # Add layer  into the map
-            self.map_ + square_alerts
-
-            self.map_.w_alerts.disabled = False
-            self.map_.w_alerts.show()
+        if self.model.alerts_type == "nrt":
+            msg = cm.ui.alert_number.format(
+                len(self.model.aoi_alerts), self.model.offset_days
+            )
+        else:
+            msg = cm.ui.historic.alert_number.format(
+                len(self.model.aoi_alerts),
+                self.model.start_date,
+                self.model.get_end_date(),
+            )
 
-            if self.model.alerts_type == "recent":
-                msg = cm.ui.alert_number.format(
-                    len(self.model.aoi_alerts), self.model.offset_days
-                )
-            else:
-                msg = cm.ui.historic.alert_number.format(
-                    len(self.model.aoi_alerts),
-                    self.model.start_date,
-                    self.model.offset_days,
-                )
+        self.alert.add_msg(msg, type_="success")
+        self.report_aoi_counts()
+        self.report_payload_size(self.model.aoi_alerts)
 
-            self.alert.add_msg(msg, type_="success")
+        if len(self.model.aoi_alerts) > param.MAX_ALERTS:
+            msg = cm.alerts.overloaded
+            if not TILE_SERVER.is_available():
+                msg = cm.alerts.overloaded_window
 
-        else:
-            SepalWarning(
-                cm.alerts.overloaded.format(
-                    len(self.model.aoi_alerts), param.MAX_ALERTS
-                )
+            self.alert.append_msg(
+                msg.format(len(self.model.aoi_alerts), param.MAX_ALERTS)
             )
 
         self.download_btn.disabled = False
+        self.refresh_btn.disabled = self.model.alerts_type != "nrt"
 
         self.model.reset = False
 
+    def report_aoi_counts(self):
+        """Display the number of alerts of each feature when using several
+        features"""
+
+        if len(self.model.aoi_counts) > 1:
+            for name, count in self.model.aoi_counts.items():
+                self.alert.append_msg(cm.ui.feature_count.format(name, count))
+
+    def report_payload_size(self, alerts):
+        """Display the estimated size of the alerts features sent to the map, to
+        compare the compact serialization with the full one"""
+
+        # The tiles layer doesn't send any feature
+        if len(alerts) > param.MAX_ALERTS and TILE_SERVER.is_available():
+            return
+
+        # The windowed layers send up to MAX_ALERTS alerts at once
+        full, compact = self.model.get_payload_sizes(alerts.iloc[: param.MAX_ALERTS])
+        self.alert.append_msg(cm.ui.payload_size.format(compact // 1024, full // 1024))
+
+    def add_alerts_layer(self, alerts):
+        """Convert the alerts into squares and add them to the map as a clickable
+        layer. Above MAX_ALERTS, they are displayed as a raster tiles layer when
+        the tiles can be served to the browser.
+
+        Args:
+            alerts (gpd.GeoDataFrame): alerts to display
+        """
+
+        # Too many squares would freeze the browser, render them in the kernel.
+        # Otherwise only the alerts around the view are sent, as below MAX_ALERTS
+        if len(alerts) > param.MAX_ALERTS and TILE_SERVER.is_available():
+            self.map_.add_alerts_tiles(self.model.get_renderer(alerts))
+            return
+
+        # Convert aoi alert points into squares, only the ones around the map
+        # view are sent to the map
+        square_alerts = self.model.alerts_to_squares(alerts.iloc[:0])
+
+        # Create an event for the alerts
+        def geojson_callback(**kwargs):
+            self.map_.w_alerts.v_model = int(kwargs["id"])
+
+        square_alerts.on_click(geojson_callback)
+
+        # Add layer  into the map
+        self.map_.add_windowed_layer(square_alerts, alerts)
+
+    @loading_button()
+    def refresh_alerts(self, widget, change, data):
+        """Append the near real time alerts published since the last request to the
+        current ones, without losing the reviewed alerts"""
+
+        self.alert.add_live_msg(cm.ui.downloading_alerts, type_="info")
+
+        new_alerts = self.model.refresh_alerts()
+
+        # Only the new alerts are added to the map, in their own layer
+        if len(new_alerts) and not self.map_.w_alerts.disabled:
+            self.map_.w_alerts.set_ids(
+                self.model.get_confidence_ids(self.map_.w_alerts.confidence)
+            )
+            self.map_.w_alerts.w_conf.items = self.model.get_confidence_items()
+            self.model.compute_aggregates()
+            self.map_.reset_aggregates()
+
+            self.add_alerts_layer(new_alerts)
+
+        self.alert.add_msg(cm.ui.refreshed.format(len(new_alerts)), type_="success")
+
     def filter_confidence(self, change):
         """Filter alert list by confidence"""
 
-        confidence = change["new"]
+        self.map_.w_alerts.set_ids(self.model.get_confidence_ids(change["new"]))
 
-        if confidence != "All":
-            #
-            if self.model.satsource != "modis":
-                self.map_.w_alerts.items = self.model.aoi_alerts[
-                    self.model.aoi_alerts.confidence == confidence.lower()
-                ].index.to_list()
+        # Select first item
+        if self.map_.w_alerts.ids:
+            self.map_.w_alerts.v_model = self.map_.w_alerts.ids[0]
 
-            else:
-                upper, lower = scripts.get_thresholds(lower=confidence)
-                self.map_.w_alerts.items = self.model.aoi_alerts[
-                    (self.model.aoi_alerts.confidence <= upper)
-                    & (self.model.aoi_alerts.confidence > lower)
-                ].index.to_list()
+    def sort_alerts(self, change):
+        """Navigate the alerts in the selected order, from the current one"""
 
-        else:
-            self.map_.w_alerts.items = self.model.aoi_alerts.index.to_list()
+        self.model.order = change["new"]
 
-        # Select first item
-        self.map_.w_alerts.v_model = self.map_.w_alerts.items[0]
+        if self.model.aoi_alerts is None:
+            return
+
+        self.model.build_confidence_index()
+        self.map_.w_alerts.set_ids(
+            self.model.get_confidence_ids(self.map_.w_alerts.confidence)
+        )
+
+    def group_events(self, change):
+        """Navigate the fire events instead of the alerts, or the opposite"""
+
+        self.model.by_event = change["new"]
+
+        if self.model.aoi_alerts is None:
+            return
+
+        self.map_.w_alerts.set_ids(
+            self.model.get_confidence_ids(self.map_.w_alerts.confidence)
+        )
+
+        # Keep the current alert when it's listed
+        if self.map_.w_alerts.cursor is None and self.map_.w_alerts.ids:
+            self.map_.w_alerts.v_model = self.map_.w_alerts.ids[0]
 
     def _get_metadata(self, alert_id):
         """Get a metadata table of alert and display as control widget on map
@@ -370,21 +486,32 @@ class AlertsView(sw.ExpansionPanel):
             alert_id (str): Current alert id index
         """
 
+        alert = self.model.aoi_alerts.loc[alert_id]
+
+        if self.model.by_event:
+            alert = pd.concat([alert, self.model.get_event_summary(alert_id)])
+
+        # Fused alerts have extra columns
         headers, values = list(
             zip(
                 *[
-                    (col_name, self.model.aoi_alerts.loc[alert_id, col_name])
+                    (col_name, alert[col_name])
                     for col_name in param.METADATA_ROWS
+                    if col_name in alert.index
                 ]
             )
         )
 
-        values = [round(val, 2) if isinstance(val, float64) else val for val in values]
+        values = [
+            round(float(val), 2) if isinstance(val, (float, np.floating)) else val
+            for val in values
+        ]
 
         data = zip(headers, values)
 
         # Update metadata table content
-        self.map_.metadata_table.update(self.model.satsource, data)
+        satsource = alert.get("sensor", self.model.satsource)
+        self.map_.metadata_table.update(satsource, data)
 
     def alert_list_event(self, change):
         """Update map zoom, center when selecting an alert and add metadata to
@@ -395,16 +522,24 @@ class AlertsView(sw.ExpansionPanel):
             self.model.current_alert = change["new"]
 
             # Filter dataframe to get lat,lon
-            self.map_.lat = self.model.aoi_alerts.loc[self.model.current_alert][
-                "latitude"
-            ]
+            self.map_.lat = float(
+                self.model.aoi_alerts.loc[self.model.current_alert, "latitude"]
+            )
 
-            self.map_.lon = self.model.aoi_alerts.loc[self.model.current_alert][
-                "longitude"
-            ]
+            self.map_.lon = float(
+                self.model.aoi_alerts.loc[self.model.current_alert, "longitude"]
+            )
 
-            self.map_.center = (self.map_.lat, self.map_.lon)
-            self.map_.zoom = 15
+            event_bounds = None
+            if self.model.by_event:
+                event_bounds = self.model.get_event_bounds(self.model.current_alert)
+
+            # Show the whole event, unless it's a single alert
+            if event_bounds and event_bounds[:2] != event_bounds[2:]:
+                self.map_.zoom_bounds(event_bounds)
+            else:
+                self.map_.center = (self.map_.lat, self.map_.lon)
+                self.map_.zoom = 15
             self._get_metadata(self.model.current_alert)
 
             # Search and add layers to map
@@ -413,13 +548,15 @@ class AlertsView(sw.ExpansionPanel):
 
 
 class WidgetHistoric(sw.Layout):
-    """Historic widget containing three components: start date, add_icon, and offset
-    days selection llist. It will be used to caputure the user's input related with
-    the historic data. The widget allow to capture and perform the user interactions."""
+    """Historic widget containing four components: start date, add_icon, offset
+    days selection llist and an optional end date. It will be used to caputure the
+    user's input related with the historic data. When the end date is set, the offset
+    days are ignored and the query can be longer than the FIRMS 10 days limit. The
+    widget allow to capture and perform the user interactions."""
 
     def __init__(self, model):
         self.model = model
-        self.class_ = "d-flex"
+        self.class_ = "d-flex flex-wrap"
         self.align_center = True
 
         super().__init__()
@@ -439,6 +576,10 @@ class WidgetHistoric(sw.Layout):
             v_model=self.model.offset_days,
         )
 
+        self.w_end = cw.DatePicker(
+            label=cm.alerts.wlabel.end, style_="min-width:181px", v_model=""
+        )
+
         add_icon = v.Btn(
             children=[
                 v.Icon(
@@ -449,34 +590,40 @@ class WidgetHistoric(sw.Layout):
             x_small=True,
         )
 
-        self.model.bind(self.w_date, "start_date")
+        self.model.bind(self.w_date, "start_date").bind(self.w_end, "end_date")
         link((self.model, "offset_days"), (self.w_days, "v_model"))
 
         self.children = [
             v.Flex(xs5=True, children=[self.w_date]),
             v.Flex(xs2=True, class_="mx-2", children=[add_icon]),
             v.Flex(xs5=True, children=[self.w_days]),
+            v.Flex(xs5=True, children=[self.w_end]),
         ]
 
         add_icon.on_event("click", self.add_days)
+        self.w_end.observe(self.toggle_days, "v_model")
 
     def set_min_max_dates(self, *args):
-        """from a request. use the already available availability df to set min and max
-        dates in the date_picker."""
+        """from a request. use the already available availability dict to set min and
+        max dates in the date_picker, covered by all the fused sensors."""
 
         if self.model.availability is not None:
             # Get the picker as it is embbeded into the menu that wraps the widget.
-            data = self.model.availability
-            _, self.w_date.date_picker.min, self.w_date.date_picker.max = (
-                data[
-                    data.data_id
-                    == param.SAT_SOURCE[self.model.alerts_type][self.model.satsource]
-                ]
-                .values[0]
-                .tolist()
-            )
+            (
+                self.w_date.date_picker.min,
+                self.w_date.date_picker.max,
+            ) = self.model.get_date_range()
             self.w_date.date_picker.v_model = self.w_date.date_picker.max
 
+            self.w_end.date_picker.min = self.w_date.date_picker.min
+            self.w_end.date_picker.max = self.w_date.date_picker.max
+            self.w_end.date_picker.v_model = ""
+
+    def toggle_days(self, change):
+        """Disable the offset days selection when an end date is set"""
+
+        self.w_days.disabled = bool(change["new"])
+
     def add_days(self, *args):
         """set the next of the current value from the w_days items"""
 
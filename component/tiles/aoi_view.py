@@ -1,18 +1,13 @@
-import json
-
-import geopandas as gpd
 import ipyvuetify as v
 import sepal_ui.sepalwidgets as sw
 from ipyleaflet import GeoJSON
 from sepal_ui.scripts import utils as su
 
-import component.parameter as param
+import component.scripts as scripts
 from component.message import cm
 
 __all__ = ["AoiView"]
 
-COUNTRIES = gpd.read_file(param.COUNTRIES_JSON)
-
 
 class AoiView(v.Card):
     def __init__(self, model, map_, *args, **kwargs):
@@ -40,7 +35,7 @@ class AoiView(v.Card):
         self.w_countries = sw.Select(
             label=cm.aoi.method.country,
             v_model="",
-            items=COUNTRIES.name.to_list(),
+            items=[],
         ).hide()
 
         # Bind selected parameters
@@ -54,11 +49,19 @@ class AoiView(v.Card):
         self.w_countries.observe(self.add_country_event, "v_model")
 
     def aoi_method_event(self, change):
-        """Toggle components"""
+        """Toggle components and forget the aoi of the previous method"""
 
         self.map_.remove_all()
 
+        self.model.set_aoi(None)
+        self.map_.drawn_aoi = None
+        self.map_.aoi_frozen = False
+
         if change["new"] == "country":
+            # The countries are only read the first time the method is used
+            if not self.w_countries.items:
+                self.w_countries.items = scripts.get_country_names()
+
             self.map_.dc.hide()
             su.show_component(self.w_countries)
 
@@ -71,25 +74,21 @@ class AoiView(v.Card):
         """Add the selected country in the map"""
 
         self.map_.remove_all()
+        self.model.set_aoi(None)
 
         if change["new"]:
 
-            country_df = COUNTRIES[COUNTRIES["name"] == change["new"]]
-            geometry = country_df.iloc[0].geometry
+            country = scripts.get_country(change["new"])
 
-            lon, lat = [xy[0] for xy in geometry.centroid.xy]
-
-            data = json.loads(country_df.to_json())
-
-            self.model.aoi_geometry = data
+            # Clip with the exact geometry but only send the simplified one to
+            # the map
+            self.model.set_aoi(country["data"], country["gdf"])
 
             aoi = GeoJSON(
-                data=data,
+                data=country["display"],
                 name=change["new"],
             )
 
-            bounds = geometry.bounds
-
-            self.map_.zoom_bounds(bounds)
-            self.map_.center = (lat, lon)
+            self.map_.zoom_bounds(country["bounds"])
+            self.map_.center = country["center"]
             self.map_.add_layer(aoi)
@@ -1,11 +1,16 @@
-from ipyleaflet import Marker, WidgetControl
+import numpy as np
+from ipyleaflet import GeoJSON, Marker, TileLayer, WidgetControl
 from ipywidgets import Button, Layout, Output
 from sepal_ui import color
 from sepal_ui import mapping as m
 from sepal_ui import sepalwidgets as sw
+from tornado.ioloop import IOLoop
 
+import component.parameter as param
+import component.scripts as scripts
 import component.widget as cw
 from component.message import cm
+from component.scripts.tile_server import TILE_SERVER
 
 __all__ = ["AlertMap"]
 
@@ -19,6 +24,29 @@ class AlertMap(m.SepalMap):
         self.lon = None
         self.min_zoom = 2
 
+        # Whether the drawn aoi has been replaced by a static layer
+        self.aoi_frozen = False
+
+        # Feature collection of the drawn shapes, the aoi is only extended when
+        # it's still this one
+        self.drawn_aoi = None
+
+        # Ids of the alerts layers served by the tile server
+        self.tiles_ids = []
+
+        # Level of detail: the alerts layers are only displayed at high zoom
+        # levels, the aggregates layer of the current zoom level below
+        self.alerts_layers = []
+        self.aggregates_layers = {}
+        self.aggregates_layer = None
+
+        # Vector alerts layers only holding the alerts around the view, with
+        # their alerts, grid index and displayed positions, and debounce timer
+        # of the map moves
+        self.windows = []
+        self.window_timer = None
+        self.window_loop = None
+
         kwargs["dc"] = True
         kwargs["gee"] = False
         kwargs["statebar"] = False
@@ -61,8 +89,10 @@ class AlertMap(m.SepalMap):
         )
 
         self.model.observe(self.reset, "reset")
+        self.observe(self.update_detail, "zoom")
+        self.observe(self.schedule_windows, "bounds")
 
-        self.metadata_table.observe(self.model.metadata_change, "validate")
+        self.metadata_table.observe(self.model.metadata_change, "reviewed")
         self.metadata_table.observe(self.model.metadata_change, "observ")
 
     def reset(self, change):
@@ -71,9 +101,30 @@ class AlertMap(m.SepalMap):
         if change["new"] is True:
             # Remove previous alert layers
             self.remove_layers_if("name", equals_to="Alerts")
+            self.clear_alerts_layers()
             self.w_alerts.reset()
             self.metadata_table.reset()
 
+    def remove_all(self, *args, **kwargs):
+        """Remove all the layers, and forget the alerts layers so they are not
+        displayed again when zooming"""
+
+        super().remove_all(*args, **kwargs)
+        self.clear_alerts_layers()
+
+    def clear_alerts_layers(self):
+        """Forget the alerts and aggregates layers and stop serving their tiles"""
+
+        for layer_id in self.tiles_ids:
+            TILE_SERVER.remove(layer_id)
+
+        self.tiles_ids = []
+        self.alerts_layers = []
+        self.aggregates_layers = {}
+        self.aggregates_layer = None
+        self.windows = []
+        self.cancel_windows()
+
     def add_widget_as_control(self, widget, position, first=False):
         """Add widget as control in the given position
 
@@ -97,12 +148,183 @@ class AlertMap(m.SepalMap):
             self.controls = self.controls + tuple([new_control])
 
     def handle_draw(self, target, action, geo_json):
-        """Store geometry geometry in the model"""
+        """Store the drawn geometries in the model. Several features can be drawn
+        to monitor them at once"""
 
         self.remove_all()
+
+        # Start a new aoi when drawing after the previous one has been frozen,
+        # or when the current one comes from another method
+        features = []
+        if self.drawn_aoi and self.model.aoi_geometry is self.drawn_aoi:
+            features = [] if self.aoi_frozen else self.drawn_aoi["features"]
+
+        self.aoi_frozen = False
+
         if action == "created":
-            self.model.aoi_geometry = {"type": "FeatureCollection", "features": []}
-            self.model.aoi_geometry["features"].append(geo_json)
+            features = features + [geo_json]
+
+        elif action == "deleted":
+            features = [f for f in features if f["geometry"] != geo_json["geometry"]]
+
+        # Always set a new aoi so the model builds its geodataframe again
+        self.drawn_aoi = (
+            {"type": "FeatureCollection", "features": features} if features else None
+        )
+        self.model.set_aoi(self.drawn_aoi)
+
+    def freeze_drawn_aoi(self):
+        """Replace the drawn features by a static layer so they don't catch the
+        clicks on the alerts. The next drawing will start a new aoi."""
+
+        self.dc.clear()
+        self.add_layer(GeoJSON(data=self.model.aoi_geometry))
+        self.aoi_frozen = True
+
+    def add_alerts_tiles(self, renderer):
+        """Display the alerts as a raster layer rendered in the kernel
+
+        Args:
+            renderer (scripts.AlertsRenderer): renderer of the alerts tiles
+        """
+
+        layer_id, url = TILE_SERVER.add(renderer)
+        self.tiles_ids.append(layer_id)
+
+        self.add_alerts_layer(TileLayer(url=url, name="Alerts", max_zoom=22))
+
+    def add_alerts_layer(self, layer):
+        """Add a layer of alerts, only displayed above the aggregated zoom levels
+
+        Args:
+            layer (ipyleaflet.Layer): alerts layer
+        """
+
+        self.alerts_layers.append(layer)
+        self.update_detail()
+
+    def add_windowed_layer(self, layer, alerts):
+        """Add a vector layer of alerts only holding the alerts around the map
+        view. Its data is updated when the map stops moving.
+
+        Args:
+            layer (ipyleaflet.GeoJSON): alerts layer
+            alerts (gpd.GeoDataFrame): alerts to display in the layer
+        """
+
+        window = {
+            "layer": layer,
+            "alerts": alerts,
+            "index": scripts.GridIndex(alerts.longitude, alerts.latitude),
+            "positions": None,
+        }
+        self.windows.append(window)
+
+        self.update_window(window)
+        self.add_alerts_layer(layer)
+
+    def schedule_windows(self, change):
+        """Update the windowed layers once the map view has not changed for
+        WINDOW_DEBOUNCE seconds"""
+
+        self.cancel_windows()
+
+        # The update is run by the kernel event loop, on the thread that owns
+        # the widgets
+        self.window_loop = IOLoop.current()
+        self.window_timer = self.window_loop.call_later(
+            param.WINDOW_DEBOUNCE, self.update_windows
+        )
+
+    def cancel_windows(self):
+        """Cancel the scheduled update of the windowed layers, if any"""
+
+        if self.window_timer is not None:
+            self.window_loop.remove_timeout(self.window_timer)
+            self.window_timer = None
+
+    def update_windows(self):
+        """Update the data of the windowed layers with the alerts around the
+        current view"""
+
+        self.window_timer = None
+
+        # The alerts may have been cleared since the update was scheduled
+        if self.model.aoi_alerts is None:
+            return
+
+        for window in self.windows:
+            self.update_window(window)
+
+    def update_window(self, window):
+        """Set the data of a windowed layer to the alerts inside the map bounds
+        and a margin around them, up to MAX_ALERTS"""
+
+        # The alerts layers are hidden at the aggregated zoom levels
+        if not self.bounds or int(round(self.zoom)) in self.model.aggregates:
+            return
+
+        (south, west), (north, east) = self.bounds
+        dx = (east - west) * param.WINDOW_MARGIN
+        dy = (north - south) * param.WINDOW_MARGIN
+
+        index = window["index"]
+        positions = index.query(west - dx, south - dy, east + dx, north + dy)
+
+        # Just above the aggregated zoom levels a window can hold most of the
+        # alerts, only send the ones closest to the center of the view
+        if len(positions) > param.MAX_ALERTS:
+            # Views crossing the antimeridian have longitudes beyond +/-180
+            lon = (index.lon[positions] - (west + east) / 2 + 180) % 360 - 180
+            lat = index.lat[positions] - (south + north) / 2
+            closest = np.argpartition(lon**2 + lat**2, param.MAX_ALERTS)
+            positions = np.sort(positions[closest[: param.MAX_ALERTS]])
+
+        # Don't send the same features again
+        if window["positions"] is not None and np.array_equal(
+            positions, window["positions"]
+        ):
+            return
+
+        window["positions"] = positions
+        window["layer"].data = self.model.alerts_to_features(
+            window["alerts"].iloc[positions]
+        )
+
+    def reset_aggregates(self):
+        """Drop the aggregates layers built from the previous model aggregates"""
+
+        if self.aggregates_layer in self.layers:
+            self.remove_layer(self.aggregates_layer)
+
+        self.aggregates_layers = {}
+        self.aggregates_layer = None
+        self.update_detail()
+
+    def update_detail(self, *args):
+        """Display either the alerts or the aggregates of the current zoom level.
+        The aggregates layers are built on the first display of each zoom level."""
+
+        zoom = int(round(self.zoom))
+        aggregated = zoom in self.model.aggregates
+
+        if aggregated and zoom not in self.aggregates_layers:
+            self.aggregates_layers[zoom] = self.model.aggregates_to_layer(zoom)
+
+        layer = self.aggregates_layers[zoom] if aggregated else None
+
+        if self.aggregates_layer is not layer:
+            if self.aggregates_layer in self.layers:
+                self.remove_layer(self.aggregates_layer)
+            if layer is not None:
+                self.add_layer(layer)
+            self.aggregates_layer = layer
+
+        for alerts_layer in self.alerts_layers:
+            if aggregated and alerts_layer in self.layers:
+                self.remove_layer(alerts_layer)
+            elif not aggregated and alerts_layer not in self.layers:
+                self.add_layer(alerts_layer)
 
     def remove_layers_if(self, prop, equals_to, _metadata=False):
         """Remove layers with a given property and value
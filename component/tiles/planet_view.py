@@ -1,14 +1,10 @@
-import datetime
-import json
-
 import ipyvuetify as v
 import pandas as pd
 import sepal_ui.sepalwidgets as sw
 from ipyleaflet import TileLayer
-from shapely.geometry import Point
-from shapely_geojson import dumps
 
 import component.parameter as param
+import component.scripts as scripts
 from component.message import cm
 from component.model import AlertModel
 from sepal_ui.planetapi.planet_view import PlanetView as PV
@@ -171,30 +167,29 @@ class PlanetView(sw.Card):
             )
 
     def _get_items(self):
-        """Get planet items based on the current coordinates"""
-
-        # Get current map coordinates
-        lat = self.map_.lat
-        lon = self.map_.lon
-
-        aoi = json.loads(dumps(Point(lon, lat).buffer(0.001, cap_style=3)))
-
-        acqdate = self.model.aoi_alerts.loc[self.model.current_alert].acq_date
-
-        now = datetime.datetime.strptime(acqdate, "%Y-%m-%d")
-
-        days_before = self.model.days_before
-        days_after = self.model.days_after
+        """Get planet items based on the current coordinates, or on the extent
+        and dates of the current fire event when navigating by event. The
+        searches already done are read from the cache"""
 
-        start = now - datetime.timedelta(days=days_before)
-        end = now + datetime.timedelta(days=days_after + 1)
-        cloud_cover = self.model.cloud_cover / 100
+        search = self.model.get_planet_search(
+            self.model.current_alert, (self.map_.lon, self.map_.lat)
+        )
 
         return (
             "Alert",
-            self.model.planet_model.get_items(aoi, start, end, cloud_cover),
+            scripts.PLANET_PREFETCHER.get_items(self.model.planet_model, *search),
         )
 
+    def prefetch_items(self):
+        """Search the Planet items of the alerts around the current one in the
+        navigator in the background, so going to the next or previous alert
+        doesn't wait for the Planet API"""
+
+        neighbours = self.map_.w_alerts.get_neighbours(param.PREFETCH_ALERTS)
+        searches = [self.model.get_planet_search(id_) for id_ in neighbours]
+
+        scripts.PLANET_PREFETCHER.prefetch(self.model.planet_model, searches)
+
     def _prioritize_items(self, items):
         """Prioritize planet items"""
 
@@ -262,6 +257,8 @@ class PlanetView(sw.Card):
 
             items_df = self._prioritize_items(items)
 
+            self.prefetch_items()
+
             # remove all previous loaded assets
 
             self.map_.remove_layers_if("attribution", "Imagery © Planet Labs Inc.")
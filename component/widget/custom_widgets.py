@@ -1,6 +1,8 @@
+from itertools import islice
+
 import ipyvuetify as v
 import sepal_ui.sepalwidgets as sw
-from traitlets import Any, Int, List, Unicode, link
+from traitlets import Any, Bool, Int, Unicode, link
 
 import component.parameter as param
 import component.scripts.scripts as cs
@@ -15,27 +17,40 @@ __all__ = [
 
 
 class DynamicSelect(sw.Card):
-    """Widget to navigate with next and previous buttons over a list
+    """Widget to navigate with next and previous buttons over a list of ids.
+
+    The ids and the position of the current one are kept in the kernel, only a
+    page of ids around the current one is sent to the select list. Any id can
+    be reached by typing it in the search field.
 
     Args:
-        items (list) : List of items to be displayed in select list
         label (str) : Label to display into widget
+        page_size (int): number of ids displayed in the select list
 
     Parameters:
         v_model (traitlets.Any): Current element from select list
+        order (traitlets.Unicode): Order of the ids, one of param.TRAVERSAL_ORDERS
+        by_event (traitlets.Bool): Whether the ids are the ones of fire events
 
     """
 
-    items = List([]).tag(sync=True)
     v_model = Any().tag(sync=True)
     confidence = Any("All").tag(sync=True)
+    order = Unicode("firms").tag(sync=True)
+    by_event = Bool(False).tag(sync=True)
 
-    def __init__(self, label="", **kwargs):
+    def __init__(self, label="", page_size=param.PAGE_SIZE, **kwargs):
 
         self.label = label
         self.dense = True
         self.max_width = "520"
 
+        # Kernel side list of ids, position of each id and current position
+        self.ids = []
+        self.positions = {}
+        self.cursor = None
+        self.page_size = page_size
+
         super().__init__(**kwargs)
 
         self.close = v.Icon(children=["mdi-close"], small=True)
@@ -65,11 +80,42 @@ class DynamicSelect(sw.Card):
         self.w_list = v.Select(
             class_="mt-4 ml-2",
             label=self.label,
-            items=self.items,
+            items=[],
             v_model="",
             dense=True,
         )
 
+        self.w_search = v.TextField(
+            class_="mt-0 pt-0",
+            dense=True,
+            hide_details=True,
+            prepend_icon="mdi-magnify",
+            placeholder=cm.alerts.wlabel.search,
+            v_model="",
+        )
+
+        self.w_order = v.Select(
+            class_="mt-0 pt-0 mx-2",
+            dense=True,
+            hide_details=True,
+            prepend_icon="mdi-sort",
+            items=[
+                {"text": text, "value": value}
+                for value, text in param.TRAVERSAL_ORDERS.items()
+            ],
+            v_model="firms",
+        )
+
+        self.w_by_event = v.Switch(
+            class_="mt-0 pt-0",
+            dense=True,
+            hide_details=True,
+            label=cm.alerts.wlabel.by_event,
+            v_model=False,
+        )
+
+        self.w_position = v.Html(tag="span", class_="caption", children=[""])
+
         widgets = [self.w_prev, self.w_conf, self.w_list, self.w_next]
 
         self.children = [
@@ -80,47 +126,125 @@ class DynamicSelect(sw.Card):
                     v.Col(cols=f"{col}", class_="text-center", children=[widget])
                     for col, widget in zip([2, 3, 5, 2], widgets)
                 ],
-            )
+            ),
+            v.Row(
+                no_gutters=True,
+                align="center",
+                children=[
+                    v.Col(cols="4", children=[self.w_search]),
+                    v.Col(cols="3", children=[self.w_order]),
+                    v.Col(cols="3", children=[self.w_by_event]),
+                    v.Col(cols="2", class_="text-center", children=[self.w_position]),
+                ],
+            ),
         ]
 
-        link((self.w_list, "items"), (self, "items"))
         link((self.w_list, "v_model"), (self, "v_model"))
         link((self.w_conf, "v_model"), (self, "confidence"))
+        link((self.w_order, "v_model"), (self, "order"))
+        link((self.w_by_event, "v_model"), (self, "by_event"))
+
+        self.observe(self.update_cursor, "v_model")
 
         self.w_prev.on_event("click", self.prev_next_event)
         self.w_next.on_event("click", self.prev_next_event)
+        self.w_search.on_event("change", self.search_event)
         self.close.on_event("click", lambda *args: self.hide())
 
-    def prev_next_event(self, widget, change, data):
-        """go to the next value. loop to the first or last one if we reach the end"""
+    def set_ids(self, ids):
+        """Set the ids to navigate, keeping the current one if it's still listed
 
-        increm = widget.value
+        Args:
+            ids (list): ordered ids
+        """
+
+        self.ids = list(ids)
+        self.positions = {id_: pos for pos, id_ in enumerate(self.ids)}
+        self.cursor = self.positions.get(self.v_model)
+
+        self.set_page(self.cursor or 0)
+
+    def set_page(self, pos):
+        """Send the page of ids around a position to the select list"""
+
+        start = max(0, min(pos - self.page_size // 2, len(self.ids) - self.page_size))
+        self.w_list.items = self.ids[start : start + self.page_size]
+
+        total = len(self.ids)
+        current = "-" if self.cursor is None else self.cursor + 1
+        self.w_position.children = [f"{current}/{total}" if total else ""]
 
-        # get the current position in the list
-        val = self.w_list.v_model
-        if val in self.w_list.items:
-            pos = self.w_list.items.index(val)
+    def update_cursor(self, change):
+        """Move the cursor to the selected id, and the page if it's not listed"""
 
-            pos += increm
+        self.cursor = self.positions.get(change["new"])
 
-            # check if loop is required
-            if pos == -1:
-                pos = len(self.w_list.items) - 1
-            elif pos >= len(self.w_list.items):
-                pos = 0
+        if self.cursor is not None:
+            if change["new"] not in self.w_list.items:
+                self.set_page(self.cursor)
+            else:
+                self.w_position.children = [f"{self.cursor + 1}/{len(self.ids)}"]
+
+    def prev_next_event(self, widget, change, data):
+        """go to the next value. loop to the first or last one if we reach the end"""
+
+        if not self.ids:
+            return
 
         # if none was selected always start by the first
-        else:
+        if self.cursor is None:
             pos = 0
+        else:
+            pos = (self.cursor + widget.value) % len(self.ids)
 
-        self.w_list.v_model = self.w_list.items[pos]
+        self.v_model = self.ids[pos]
+
+    def get_neighbours(self, n):
+        """Get the n ids after and before the current one, from the closest,
+        looping like the next and previous buttons"""
+
+        if self.cursor is None or len(self.ids) < 2:
+            return []
+
+        positions = []
+        for step in range(1, n + 1):
+            positions += [self.cursor + step, self.cursor - step]
+
+        neighbours = [self.ids[pos % len(self.ids)] for pos in positions]
+
+        # Short lists loop on themselves
+        current = self.ids[self.cursor]
+        return [id_ for id_ in dict.fromkeys(neighbours) if id_ != current]
+
+    def search_event(self, widget, event, data):
+        """Jump to the typed id, or list the ids starting with the typed text"""
+
+        text = (data or "").strip()
+
+        if not text:
+            return
+
+        id_ = int(text) if text.isdigit() else text
+
+        if id_ in self.positions:
+            self.v_model = id_
+            return
+
+        matches = (id_ for id_ in self.ids if str(id_).startswith(text))
+        self.w_list.items = list(islice(matches, self.page_size))
 
     def reset(self):
         """Restore widgets and values to default"""
 
-        self.items = []
+        self.ids = []
+        self.positions = {}
+        self.cursor = None
+
+        self.w_list.items = []
         self.v_model = ""
         self.confidence = "All"
+        self.w_search.v_model = ""
+        self.w_position.children = [""]
 
         self.w_conf.items = []
 